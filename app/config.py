@@ -12,42 +12,65 @@ Goals:
 from __future__ import annotations
 
 import os
-from typing import Set, List
+from functools import lru_cache
+from typing import FrozenSet, Optional
 
 # ---------------- helpers ----------------
 
+@lru_cache(maxsize=None)
+def _cached_getenv(name: str) -> Optional[str]:
+    # Environment is read once per key; every module sharing these knobs hits the cache.
+    return os.getenv(name)
+
 def _env_int(name: str, default: int) -> int:
+    raw = _cached_getenv(name)
+    if raw is None:
+        return default
     try:
-        return int(os.getenv(name, str(default)))
+        return int(raw)
     except Exception:
         return default
 
 def _env_float(name: str, default: float) -> float:
+    raw = _cached_getenv(name)
+    if raw is None:
+        return default
     try:
-        return float(os.getenv(name, str(default)))
+        return float(raw)
     except Exception:
         return default
 
+def _env_str(name: str, default: str) -> str:
+    raw = _cached_getenv(name)
+    return default if raw is None else raw
+
 def _env_bool(name: str, default: bool) -> bool:
-    val = os.getenv(name)
+    val = _cached_getenv(name)
     if val is None:
         return default
     return str(val).strip().lower() in {"1", "true", "yes", "on"}
 
-def _env_csv_set(name: str, default_items: List[str]) -> Set[str]:
-    raw = os.getenv(name)
+def _env_csv_set(name: str, default_set: FrozenSet[str]) -> FrozenSet[str]:
+    raw = _cached_getenv(name)
     if not raw:
-        return {x.strip().lower() for x in default_items}
-    parts = [p.strip().lower() for p in raw.split(",")]
-    return {p for p in parts if p}
+        return default_set  # prebuilt constant; nothing to split or allocate
+    return frozenset(p for p in (x.strip().lower() for x in raw.split(",")) if p)
+
+# Prebuilt defaults (already normalized: stripped + lowercased)
+_DEFAULT_ALLOWED_EXTS: FrozenSet[str] = frozenset({".pptx", ".potx"})
+_WILDCARD: FrozenSet[str] = frozenset({"*"})
 
 # ---------------- files & uploads ----------------
 
 # Max upload size (MB) for template files
 MAX_FILE_MB: int = _env_int("MAX_FILE_MB", 20)
 
+# Max request body (MB), enforced before the multipart parser spools anything;
+# the extra MB covers the text/guidance form fields around the template
+MAX_REQUEST_MB: int = _env_int("MAX_REQUEST_MB", MAX_FILE_MB + 1)
+
 # Which file extensions we accept for PowerPoint templates
-ALLOWED_EXTS: Set[str] = _env_csv_set("ALLOWED_EXTS", [".pptx", ".potx"])
+ALLOWED_EXTS: FrozenSet[str] = _env_csv_set("ALLOWED_EXTS", _DEFAULT_ALLOWED_EXTS)
 
 # Zip safety (prevents zip-bombs and bogus PPTX)
 MAX_ZIP_ENTRIES: int = _env_int("MAX_ZIP_ENTRIES", 2000)
@@ -57,14 +80,19 @@ MAX_ZIP_MEMBER_MB: int = _env_int("MAX_ZIP_MEMBER_MB", 50)
 MAX_TEMPLATE_IMAGES: int = _env_int("MAX_TEMPLATE_IMAGES", 20)
 MAX_TEMPLATE_IMAGE_MB: int = _env_int("MAX_TEMPLATE_IMAGE_MB", 5)
 
+# Layout-name near-miss threshold (difflib ratio) for find_preferred_layout's fuzzy tier.
+# 0.85 accepts "title + content" ~ "title and content" (0.875) and plurals (~0.95), but
+# rejects "blank" ~ "black" (0.80) and "title only" ~ "title slide" (0.67). 1.0 disables it.
+LAYOUT_NAME_FUZZY_RATIO: float = _env_float("LAYOUT_NAME_FUZZY_RATIO", 0.85)
+
 # ---------------- LLM & routing ----------------
 
 # Default provider & model
-DEFAULT_PROVIDER: str = os.getenv("DEFAULT_PROVIDER", "openai")
-DEFAULT_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
+DEFAULT_PROVIDER: str = _env_str("DEFAULT_PROVIDER", "openai")
+DEFAULT_MODEL: str = _env_str("OPENAI_MODEL", "gpt-4.1-mini")
 
 # OpenAI-compatible base URL (AI Pipe by default)
-OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "https://aipipe.org/openai/v1")
+OPENAI_BASE_URL: str = _env_str("OPENAI_BASE_URL", "https://aipipe.org/openai/v1")
 
 # Network behavior for LLM calls
 LLM_TIMEOUT_SECS: float = _env_float("LLM_TIMEOUT_SECS", 60.0)
@@ -75,6 +103,10 @@ LLM_MAX_RETRIES: int = _env_int("LLM_MAX_RETRIES", 3)
 # Max input text size to accept/process (characters)
 MAX_TEXT_CHARS: int = _env_int("MAX_TEXT_CHARS", 40_000)
 
+# UTF-8 byte budget (bounds true LLM payload size for CJK/emoji-heavy text).
+# Default is 2 bytes/char: ASCII never hits it, but 3-byte CJK text is cut to ~26.6k chars.
+MAX_TEXT_BYTES: int = _env_int("MAX_TEXT_BYTES", MAX_TEXT_CHARS * 2)
+
 # Slide/outline content limits (keep in sync across parser/schemas/builder)
 MAX_BULLETS_PER_SLIDE: int = _env_int("MAX_BULLETS_PER_SLIDE", 7)
 MAX_TITLE_CHARS: int = _env_int("MAX_TITLE_CHARS", 200)
@@ -82,14 +114,32 @@ MAX_BULLET_CHARS: int = _env_int("MAX_BULLET_CHARS", 200)
 MAX_NOTES_CHARS: int = _env_int("MAX_NOTES_CHARS", 600)
 MAX_TOTAL_SLIDES: int = _env_int("MAX_TOTAL_SLIDES", 60)
 
+# ---------------- Caching & compression ----------------
+
+# Memoized heuristic outlines (preview → generate flows usually resend the same text)
+HEURISTIC_CACHE_SIZE: int = _env_int("HEURISTIC_CACHE_SIZE", 256)
+
+# Parsed-template cache bounds (entry count + aggregate uncompressed template bytes)
+TEMPLATE_CACHE_SIZE: int = _env_int("TEMPLATE_CACHE_SIZE", 16)
+TEMPLATE_CACHE_MB: int = _env_int("TEMPLATE_CACHE_MB", 64)
+
+# Response compression: only bodies >= this size (small JSON isn't worth the CPU; 0 disables)
+GZIP_MIN_BYTES: int = _env_int("GZIP_MIN_BYTES", 64 * 1024)
+
+# ---------------- PPTX builds ----------------
+
+# Worker processes (0 = build in a thread) and max builds in flight per app worker
+PPTX_WORKERS: int = _env_int("PPTX_WORKERS", min(4, os.cpu_count() or 1))
+PPTX_CONCURRENCY: int = max(1, _env_int("PPTX_CONCURRENCY", 8))
+
 # ---------------- CORS ----------------
 
 # Comma-separated list of allowed origins for the API (use "*" for demos)
-CORS_ALLOW_ORIGINS: Set[str] = _env_csv_set("CORS_ALLOW_ORIGINS", ["*"])
+CORS_ALLOW_ORIGINS: FrozenSet[str] = _env_csv_set("CORS_ALLOW_ORIGINS", _WILDCARD)
 
 # Whether to allow credentials (cookies). For this app, defaults to False.
 CORS_ALLOW_CREDENTIALS: bool = _env_bool("CORS_ALLOW_CREDENTIALS", False)
 
 # Methods/headers are wide-open for demos; override in production if needed
-CORS_ALLOW_METHODS: Set[str] = _env_csv_set("CORS_ALLOW_METHODS", ["*"])
-CORS_ALLOW_HEADERS: Set[str] = _env_csv_set("CORS_ALLOW_HEADERS", ["*"])
+CORS_ALLOW_METHODS: FrozenSet[str] = _env_csv_set("CORS_ALLOW_METHODS", _WILDCARD)
+CORS_ALLOW_HEADERS: FrozenSet[str] = _env_csv_set("CORS_ALLOW_HEADERS", _WILDCARD)
@@ -16,22 +16,28 @@ Usage with AI Pipe:
 from __future__ import annotations
 
 import json
-import os
 import re
-import time
-from typing import Dict, Any, Optional, List
+import threading
+from typing import TYPE_CHECKING, Dict, Any, Optional, List
 
-import requests
+if TYPE_CHECKING:  # requests is imported lazily on the first LLM call
+    import requests
+
+try:  # optional fast JSON codec; stdlib json is the fallback
+    import orjson
+except ImportError:
+    orjson = None
+
+from .config import DEFAULT_MODEL, OPENAI_BASE_URL, LLM_TIMEOUT_SECS, LLM_MAX_RETRIES
 
 # ---------------- Configuration ----------------
 
-OPENAI_DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
-DEFAULT_OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://aipipe.org/openai/v1")
+# Parsed once in app.config; aliased here for readability at call sites.
+OPENAI_DEFAULT_MODEL = DEFAULT_MODEL
+DEFAULT_OPENAI_BASE_URL = OPENAI_BASE_URL
 
-REQUEST_TIMEOUT_SECS = float(os.getenv("LLM_TIMEOUT_SECS", "60"))
-MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
-# backoff per attempt index (0..MAX_RETRIES-1)
-RETRY_BACKOFF = [0.0, 0.7, 1.6][:max(1, MAX_RETRIES)]
+REQUEST_TIMEOUT_SECS = LLM_TIMEOUT_SECS
+MAX_RETRIES = LLM_MAX_RETRIES
 
 # Allowed PPT layouts that the prompt/validator should produce
 ALLOWED_LAYOUTS: List[str] = [
@@ -42,13 +48,65 @@ ALLOWED_LAYOUTS: List[str] = [
     "Picture with Caption",
     "Blank",
 ]
+_ALLOWED_LAYOUTS_SET = frozenset(ALLOWED_LAYOUTS)  # O(1) membership in the validator
+# Rendered once; the system prompt interpolates this constant string.
+_ALLOWED_LAYOUTS_REPR = repr(ALLOWED_LAYOUTS)
 
 UA = "auto-ppt-generator/1.0 (+https://huggingface.co/spaces)"
 
+# Precompiled patterns for the per-request prompt/response paths
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE | re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_WORD_RE = re.compile(r"\w+")
+
+# JSON codec for model output (orjson when installed)
+if orjson is not None:
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+else:
+    _json_loads = json.loads
+
+    def _json_dumps(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
+# Shared pooled session, built on first use so app startup never pays for importing requests.
+_SESSION: Optional["requests.Session"] = None
+_SESSION_LOCK = threading.Lock()
+
+
+def _get_session() -> "requests.Session":
+    """Keep-alive + TLS reuse; retry/backoff handled by the adapter."""
+    global _SESSION
+    if _SESSION is not None:
+        return _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util import Retry
+
+            # MAX_RETRIES counts total attempts; urllib3 counts retries after the first
+            retry = Retry(
+                total=max(0, MAX_RETRIES - 1),
+                backoff_factor=0.7,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(["POST"]),
+                respect_retry_after_header=True,
+                raise_on_status=False,  # hand the final 429/5xx back so callers report the status
+            )
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry))
+            session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry))
+            session.headers.update({"Content-Type": "application/json", "User-Agent": UA})
+            _SESSION = session
+    return _SESSION
+
 
 # ---------------- Prompt Builder ----------------
 
-def _final_system_prompt(include_notes: bool) -> str:
+def _build_system_prompt(include_notes: bool) -> str:
     notes_field = '"notes": string, ' if include_notes else ''
     return f"""
 You are a senior presentation planning assistant. Convert arbitrary input text/markdown/prose into a precise slide outline.
@@ -65,7 +123,7 @@ STRICT OUTPUT: Return ONLY a valid JSON object (no markdown fences) with this sc
 REQUIREMENTS:
 1) Slide count: choose a reasonable number based on length/complexity (typical 4–40). If minimal input, create a usable 3–5 slide scaffold.
 2) Bullets: concise (~14 words), 3–7 per slide, no redundancy. Flatten nested lists; remove noise.
-3) Layouts: set "layout" to one of {ALLOWED_LAYOUTS}. Use "auto" unless structure suggests otherwise:
+3) Layouts: set "layout" to one of {_ALLOWED_LAYOUTS_REPR}. Use "auto" unless structure suggests otherwise:
    • Many bullets → "Two Content" or "Title and Content"
    • Caption-style summary → "Content with Caption"
    • If a picture would aid readability (content still textual) → "Picture with Caption"
@@ -90,9 +148,18 @@ Output ONLY the JSON object. No code fences, no trailing commas.
 """.strip()
 
 
+# Only two renderings exist (notes on/off); build both once at import.
+_SYSTEM_PROMPTS: Dict[bool, str] = {True: _build_system_prompt(True), False: _build_system_prompt(False)}
+
+
+def _final_system_prompt(include_notes: bool) -> str:
+    return _SYSTEM_PROMPTS[bool(include_notes)]
+
+
 def _final_user_prompt(text: str, guidance: str) -> str:
     guidance_str = guidance.strip() if guidance else "none"
-    approx_words = len(re.findall(r"\w+", text or ""))
+    # Count matches without materializing every word (value is only a hint)
+    approx_words = sum(1 for _ in _WORD_RE.finditer(text or ""))
     return (
         f"GUIDANCE: {guidance_str}\n"
         f"INPUT LENGTH (approx words): {approx_words}\n"
@@ -127,56 +194,44 @@ def plan_slides_via_llm(
         raise ValueError("This build supports OpenAI-compatible providers only (e.g., AI Pipe).")
 
     prompt = _outline_prompt(text or "", guidance or "", include_notes)
+    base = (base_url or DEFAULT_OPENAI_BASE_URL).rstrip("/")
+    # Content-Type / User-Agent are session defaults; only auth varies per call
+    headers = {"Authorization": f"Bearer {api_key}"}
     return _openai_chat_or_responses_json(
         prompt=prompt,
-        api_key=api_key,
+        headers=headers,
         model=(model or OPENAI_DEFAULT_MODEL),
-        base_url=(base_url or DEFAULT_OPENAI_BASE_URL).rstrip("/"),
+        chat_url=f"{base}/chat/completions",
+        responses_url=f"{base}/responses",
         include_notes=include_notes,
     )
 
 
 # ---------------- OpenAI-compatible calls ----------------
 
-def _request_with_backoff(method: str, url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> requests.Response:
-    last_exc: Optional[Exception] = None
-    for attempt in range(len(RETRY_BACKOFF)):
-        try:
-            resp = requests.request(
-                method=method,
-                url=url,
-                headers=headers,
-                json=payload,
-                timeout=REQUEST_TIMEOUT_SECS,
-            )
-            # Retry for 5xx and 429; return otherwise
-            if resp.status_code not in (429,) and resp.status_code < 500:
-                return resp
-            # else retry
-        except Exception as e:
-            last_exc = e
-        time.sleep(RETRY_BACKOFF[attempt])
-    if last_exc:
-        raise last_exc
-    raise RuntimeError("LLM request failed after retries.")
-
-
-def _sanitize_json_text(text: str) -> str:
+def _parse_model_json(text: str) -> Any:
     """
     Strip code fences; extract the first top-level JSON object; repair trailing commas.
+    Returns the parsed value so callers never parse the same payload twice.
     """
     if not isinstance(text, str):
         raise ValueError("Model returned non-string content.")
+
+    # Fast path: JSON mode usually returns a bare object
+    try:
+        return _json_loads(text)
+    except Exception:
+        pass
+
     s = text.strip()
 
     # Remove markdown/code fences
     if s.startswith("```"):
-        s = re.sub(r"^```(?:json)?\s*|\s*```$", "", s, flags=re.IGNORECASE | re.DOTALL).strip()
+        s = _FENCE_RE.sub("", s).strip()
 
     # Already JSON?
     try:
-        json.loads(s)
-        return s
+        return _json_loads(s)
     except Exception:
         pass
 
@@ -185,9 +240,8 @@ def _sanitize_json_text(text: str) -> str:
     end = s.rfind("}")
     if start >= 0 and end > start:
         candidate = s[start : end + 1]
-        candidate = re.sub(r",\s*([}\]])", r"\1", candidate)  # trailing comma repair
-        json.loads(candidate)  # validate
-        return candidate
+        candidate = _TRAILING_COMMA_RE.sub(r"\1", candidate)  # trailing comma repair
+        return _json_loads(candidate)
 
     raise ValueError("Model output did not contain a JSON object.")
 
@@ -206,19 +260,18 @@ def _validate_and_coerce_outline(obj: Dict[str, Any], include_notes: bool) -> Di
 
     fixed_slides: List[Dict[str, Any]] = []
     for sl in slides:
+        if len(fixed_slides) >= 60:
+            break  # anything past the 60-slide cap would be sliced off anyway
         if not isinstance(sl, dict):
             continue
         stitle = str(sl.get("title") or "Slide").strip()[:160]
         bullets_raw = sl.get("bullets")
         bullets: List[str] = []
         if isinstance(bullets_raw, list):
-            for b in bullets_raw:
-                if isinstance(b, str):
-                    bb = b.strip()
-                    if bb:
-                        bullets.append(bb[:200])  # clamp single bullet length
+            # strip once, drop empties, clamp single bullet length
+            bullets = [bb[:200] for bb in (b.strip() for b in bullets_raw if isinstance(b, str)) if bb]
         layout = sl.get("layout") or "auto"
-        if layout not in ALLOWED_LAYOUTS:
+        if layout not in _ALLOWED_LAYOUTS_SET:
             layout = "auto"
 
         fixed: Dict[str, Any] = {"title": stitle, "bullets": bullets[:12], "layout": layout}
@@ -238,24 +291,17 @@ def _validate_and_coerce_outline(obj: Dict[str, Any], include_notes: bool) -> Di
 
 def _openai_chat_or_responses_json(
     prompt: Dict[str, str],
-    api_key: str,
+    headers: Dict[str, str],
     model: str,
-    base_url: str,
+    chat_url: str,
+    responses_url: str,
     include_notes: bool,
 ) -> Dict[str, Any]:
     """
     Try Chat Completions first (JSON mode). If not available on the proxy,
     fall back to the Responses API.
     """
-    # --- Common
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-        "User-Agent": UA,
-    }
-
     # --- 1) Chat Completions path
-    chat_url = base_url.rstrip("/") + "/chat/completions"
     chat_payload = {
         "model": model,
         "temperature": 0.2,
@@ -267,40 +313,33 @@ def _openai_chat_or_responses_json(
         ],
     }
 
-    resp = _request_with_backoff("POST", chat_url, headers, chat_payload)
+    resp = _get_session().post(chat_url, headers=headers, json=chat_payload, timeout=REQUEST_TIMEOUT_SECS)
     if resp.status_code == 200:
-        data = resp.json()
+        data = _json_loads(resp.content)  # parse bytes directly; no intermediate str
         try:
             content = data["choices"][0]["message"]["content"]
         except Exception as e:
             raise RuntimeError(f"Unexpected chat response shape: {data}") from e
-        sanitized = _sanitize_json_text(content)
-        return _validate_and_coerce_outline(json.loads(sanitized), include_notes)
+        return _validate_and_coerce_outline(_parse_model_json(content), include_notes)
 
     # If chat API isn’t available (404/400), try Responses API as a fallback
     if resp.status_code in (400, 404):
-        return _openai_responses_json(prompt, api_key, model, base_url, include_notes)
+        return _openai_responses_json(prompt, headers, model, responses_url, include_notes)
 
     raise RuntimeError(f"OpenAI-compatible error: {resp.status_code} {resp.text}")
 
 
 def _openai_responses_json(
     prompt: Dict[str, str],
-    api_key: str,
+    headers: Dict[str, str],
     model: str,
-    base_url: str,
+    url: str,
     include_notes: bool,
 ) -> Dict[str, Any]:
     """
     OpenAI Responses API fallback (also supported by AI Pipe).
     Sends system+user as structured input and requests JSON output.
     """
-    url = base_url.rstrip("/") + "/responses"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-        "User-Agent": UA,
-    }
     payload = {
         "model": model,
         "temperature": 0.2,
@@ -313,11 +352,11 @@ def _openai_responses_json(
         "max_output_tokens": 2048,
     }
 
-    resp = _request_with_backoff("POST", url, headers, payload)
+    resp = _get_session().post(url, headers=headers, json=payload, timeout=REQUEST_TIMEOUT_SECS)
     if resp.status_code >= 400:
         raise RuntimeError(f"OpenAI-compatible error (responses): {resp.status_code} {resp.text}")
 
-    data = resp.json()
+    data = _json_loads(resp.content)
     # Try to extract output text robustly across variants
     text_out = None
     # New-style: choices[0].message.content (some proxies mirror chat schema)
@@ -338,7 +377,6 @@ def _openai_responses_json(
         text_out = data.get("output_text")
     if not isinstance(text_out, str):
         # last resort: dump json (rare)
-        text_out = json.dumps(data, ensure_ascii=False)
+        text_out = _json_dumps(data)
 
-    sanitized = _sanitize_json_text(text_out)
-    return _validate_and_coerce_outline(json.loads(sanitized), include_notes)
+    return _validate_and_coerce_outline(_parse_model_json(text_out), include_notes)
@@ -8,47 +8,194 @@ FastAPI back end for 'Auto PPT Generator':
 
 from __future__ import annotations
 
-import io
+import asyncio
+import copy
+import hashlib
 import os
+import threading
+import re
 import base64
-from datetime import datetime
-from typing import Optional, List, Dict
+import multiprocessing
+import sys
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Optional, List, Dict, Tuple
 
 from fastapi import FastAPI, File, Form, HTTPException, UploadFile
-from fastapi.responses import HTMLResponse, StreamingResponse, Response, JSONResponse, FileResponse
+from fastapi.responses import HTMLResponse, StreamingResponse, Response, JSONResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from .pptx_builder import build_presentation
+from .pptx_builder import build_presentation, build_presentation_job
 from .parser import heuristic_outline
 from .llm_clients import plan_slides_via_llm
 from .schemas import Outline, OutlineSlide
-from .config import MAX_FILE_MB, ALLOWED_EXTS, DEFAULT_MODEL, DEFAULT_PROVIDER
-from .template_utils import is_safe_pptx, analyze_template  # safety + inspection
+from .config import (
+    MAX_FILE_MB, MAX_REQUEST_MB, ALLOWED_EXTS, DEFAULT_MODEL, DEFAULT_PROVIDER,
+    MAX_TEXT_CHARS, MAX_TEXT_BYTES, HEURISTIC_CACHE_SIZE, GZIP_MIN_BYTES, PPTX_WORKERS, PPTX_CONCURRENCY,
+    CORS_ALLOW_ORIGINS, CORS_ALLOW_CREDENTIALS, CORS_ALLOW_METHODS, CORS_ALLOW_HEADERS,
+)
+from .template_utils import inspect_template, is_safe_pptx, parse_template  # safety + inspection + cache
 
-# ---------------- Config ----------------
+try:  # optional fast JSON encoder; stdlib encoder otherwise
+    import orjson  # noqa: F401
+    _JSONResponse = ORJSONResponse
+except ImportError:
+    _JSONResponse = JSONResponse
 
-# Limit raw text length to protect both LLM and fallback parser.
-MAX_TEXT_CHARS = int(os.getenv("MAX_TEXT_CHARS", "40000"))
+# ---------------- Config ----------------
 
 # Slide count guards (also enforced in post-processing)
 MIN_SLIDES = int(os.getenv("MIN_SLIDES", "8"))
 MAX_SLIDES = int(os.getenv("MAX_SLIDES", "40"))
 
+# Download chunk size for generated decks
+STREAM_CHUNK_BYTES = 64 * 1024
+
 # Default to OpenAI-compatible provider (AI Pipe) unless caller overrides.
 DEFAULT_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://aipipe.org/openai/v1")
 
-app = FastAPI(title="Auto_PPT_Generator", version="1.2.0", docs_url="/docs")
+@asynccontextmanager
+async def _lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    yield
+    # Build pool is created lazily on the first .pptx build; stop its workers on shutdown
+    if _BUILD_POOL is not None:
+        _BUILD_POOL.shutdown(wait=False, cancel_futures=True)
 
-# If you host the UI separately, this enables cross-origin calls (demo-friendly).
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # For demos. In production, restrict this.
-    allow_credentials=False,
-    allow_methods=["*"],
-    allow_headers=["*"],
+app = FastAPI(
+    title="Auto_PPT_Generator", version="1.2.0", docs_url="/docs",
+    default_response_class=_JSONResponse, lifespan=_lifespan,
 )
 
+class _WildcardCORS:
+    """
+    Pure-ASGI CORS for the wildcard, no-credentials policy: appends a prebuilt
+    header list to every HTTP response and answers preflights directly.
+    """
+
+    _PREFLIGHT_HEADERS = [
+        (b"access-control-allow-origin", b"*"),
+        (b"access-control-allow-methods", b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"),
+        (b"access-control-max-age", b"600"),
+        (b"content-length", b"2"),
+        (b"content-type", b"text/plain; charset=utf-8"),
+    ]
+    _ORIGIN_HEADER = (b"access-control-allow-origin", b"*")
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        req_headers = dict(scope["headers"])
+        if b"origin" not in req_headers:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS" and b"access-control-request-method" in req_headers:
+            headers = list(self._PREFLIGHT_HEADERS)
+            requested = req_headers.get(b"access-control-request-headers")
+            if requested:
+                headers.append((b"access-control-allow-headers", requested))
+            await send({"type": "http.response.start", "status": 200, "headers": headers})
+            await send({"type": "http.response.body", "body": b"OK"})
+            return
+
+        async def send_with_cors(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append(self._ORIGIN_HEADER)
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+class _BodySizeLimit:
+    """
+    Pure-ASGI request-size guard. Rejects an oversized Content-Length up front and
+    counts streamed bytes (chunked bodies), so Starlette never spools more than max_bytes.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int) -> None:
+        self.app = app
+        self.max_bytes = max_bytes
+
+    def _too_large(self) -> HTTPException:
+        return HTTPException(status_code=413, detail=f"Request too large. Max is {MAX_REQUEST_MB} MB.")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        declared = dict(scope["headers"]).get(b"content-length")
+        try:
+            if declared is not None and int(declared) > self.max_bytes:
+                exc = self._too_large()
+                await _JSONResponse({"detail": exc.detail}, status_code=exc.status_code)(scope, receive, send)
+                return
+        except ValueError:
+            pass
+
+        received = 0
+
+        async def receive_limited() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside the route's body parsing → handled as a normal 413
+                    raise self._too_large()
+            return message
+
+        await self.app(scope, receive_limited, send)
+
+# Added first so CORS (outer) still decorates the 413s.
+if MAX_REQUEST_MB > 0:
+    app.add_middleware(_BodySizeLimit, max_bytes=MAX_REQUEST_MB * 1024 * 1024)
+
+# If you host the UI separately, this enables cross-origin calls (demo-friendly).
+# The default wildcard policy skips Starlette's per-request origin matching.
+if CORS_ALLOW_ORIGINS == {"*"} and not CORS_ALLOW_CREDENTIALS:
+    app.add_middleware(_WildcardCORS)
+else:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=sorted(CORS_ALLOW_ORIGINS),  # In production, restrict this.
+        allow_credentials=CORS_ALLOW_CREDENTIALS,
+        allow_methods=sorted(CORS_ALLOW_METHODS),
+        allow_headers=sorted(CORS_ALLOW_HEADERS),
+    )
+
+class _GZipExceptDownloads:
+    """
+    GZipMiddleware for JSON/HTML routes only. Generated decks are already deflated
+    zips: re-compressing them wastes CPU and drops their explicit Content-Length.
+    """
+
+    _SKIP_PATHS = frozenset({"/api/generate"})
+
+    def __init__(self, app: ASGIApp, minimum_size: int, compresslevel: int) -> None:
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=compresslevel)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"] in self._SKIP_PATHS:
+            await self.app(scope, receive, send)
+            return
+        await self.gzip(scope, receive, send)
+
+# gzip at level 1 (near-memcpy speed) for clients that accept it (large template_info / outline JSON)
+if GZIP_MIN_BYTES > 0:
+    app.add_middleware(_GZipExceptDownloads, minimum_size=GZIP_MIN_BYTES, compresslevel=1)
+
 # Serve static front-end (if present)
 static_path = os.path.join(os.path.dirname(__file__), "..", "web")
 if os.path.isdir(static_path):
@@ -57,25 +204,156 @@ if os.path.isdir(static_path):
 
 # ---------------- Helpers ----------------
 
+_FORM_TRUE = frozenset({"1", "true", "yes", "on"})
+_FORM_FALSE = frozenset({"0", "false", "no", "off", ""})
+
 def _bool_from_form(val: Optional[str | bool]) -> bool:
     """Robust bool coercion from HTML form values."""
     if isinstance(val, bool):
         return val
     if val is None:
         return False
-    s = str(val).strip().lower()
-    return s in {"1", "true", "yes", "on"}
+    # Fast path: the UI sends exact lowercase tokens
+    if val in _FORM_TRUE:
+        return True
+    if val in _FORM_FALSE:
+        return False
+    return str(val).strip().lower() in _FORM_TRUE
 
 def _clamp_text(s: str) -> str:
-    """Clamp text to MAX_TEXT_CHARS; avoids oversized payloads."""
+    """Clamp text to MAX_TEXT_CHARS and MAX_TEXT_BYTES (UTF-8); avoids oversized payloads."""
     if not s:
         return ""
-    return s if len(s) <= MAX_TEXT_CHARS else s[:MAX_TEXT_CHARS]
+    if len(s) > MAX_TEXT_CHARS:
+        s = s[:MAX_TEXT_CHARS]
+    # UTF-8 is at most 4 bytes/char: short strings can skip the encode entirely
+    if len(s) * 4 <= MAX_TEXT_BYTES:
+        return s
+    b = s.encode("utf-8", "ignore")
+    if len(b) <= MAX_TEXT_BYTES:
+        return s
+    # Cut on the byte budget; "ignore" drops a trailing partial code point
+    return bytes(memoryview(b)[:MAX_TEXT_BYTES]).decode("utf-8", "ignore")
+
+_UNSAFE_FILENAME_RE = re.compile(r"[^-_.()A-Za-z0-9]")
 
 def _safe_filename(base: str) -> str:
-    """Remove risky characters from filenames."""
-    keep = "-_.()abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
-    return "".join(ch if ch in keep else "_" for ch in base)
+    """Remove risky characters from filenames (any char outside [-_.()A-Za-z0-9] → '_')."""
+    return _UNSAFE_FILENAME_RE.sub("_", base)
+
+async def _iter_chunks(data: bytes, chunk_size: int = STREAM_CHUNK_BYTES) -> AsyncIterator[bytes]:
+    """Yield fixed-size slices of a finished file (no BytesIO line-splitting)."""
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield bytes(view[start:start + chunk_size])
+
+async def _read_upload_limited(upload: UploadFile, max_bytes: int) -> bytes:
+    """
+    Read a spooled upload after a cheap per-file size check (413). The request-level
+    cap is _BodySizeLimit; by now the body is already bounded and on disk/in memory.
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Template too large. Max is {MAX_FILE_MB} MB.")
+    return await upload.read()
+
+# ---- Outline resolution (LLM → heuristic fallback), shared by preview + generate ----
+
+_HEURISTIC_CACHE: "OrderedDict[Tuple[bytes, str, bool], Dict[str, Any]]" = OrderedDict()
+_HEURISTIC_CACHE_LOCK = threading.Lock()
+
+def _heuristic_outline_cached(text: str, guidance: str, include_notes: bool) -> Dict[str, Any]:
+    """heuristic_outline is pure in its inputs: memoize by (text digest, guidance, notes)."""
+    digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    key = (digest, guidance, include_notes)
+    with _HEURISTIC_CACHE_LOCK:
+        hit = _HEURISTIC_CACHE.get(key)
+        if hit is not None:
+            _HEURISTIC_CACHE.move_to_end(key)
+            return copy.deepcopy(hit)
+    outline_dict = heuristic_outline(text=text, guidance=guidance, include_notes=include_notes)
+    if HEURISTIC_CACHE_SIZE > 0:
+        with _HEURISTIC_CACHE_LOCK:
+            _HEURISTIC_CACHE[key] = copy.deepcopy(outline_dict)
+            while len(_HEURISTIC_CACHE) > HEURISTIC_CACHE_SIZE:
+                _HEURISTIC_CACHE.popitem(last=False)
+    return outline_dict
+
+async def _resolve_outline(
+    text: str,
+    guidance: str,
+    provider: str,
+    model: str,
+    api_key: Optional[str],
+    base_url: Optional[str],
+    include_notes: bool,
+) -> Dict[str, Any]:
+    """Use the LLM if a token is supplied; otherwise (or on any provider error) the heuristic parser."""
+    try:
+        if api_key:
+            # Blocking HTTP call: run off the event loop
+            return await asyncio.to_thread(
+                plan_slides_via_llm,
+                text=text,
+                guidance=guidance,
+                provider=provider,
+                api_key=api_key,
+                model=model,
+                base_url=(base_url or DEFAULT_BASE_URL),
+                include_notes=include_notes,
+            )
+    except Exception:
+        # Silent fallback: never expose token or provider error details
+        pass
+    return _heuristic_outline_cached(text, guidance, include_notes)
+
+# ---- PPTX build pool: real multi-core builds, bounded admissions ----
+
+_BUILD_SEM = asyncio.Semaphore(PPTX_CONCURRENCY)
+_BUILD_POOL: Optional[ProcessPoolExecutor] = None
+_BUILD_POOL_LOCK = threading.Lock()
+
+def _get_build_pool() -> Optional[ProcessPoolExecutor]:
+    global _BUILD_POOL
+    if PPTX_WORKERS <= 0:
+        return None
+    if _BUILD_POOL is None:
+        with _BUILD_POOL_LOCK:
+            if _BUILD_POOL is None:
+                # forkserver: workers never fork from the running event loop / its threads
+                ctx = multiprocessing.get_context("forkserver") if sys.platform.startswith("linux") else None
+                _BUILD_POOL = ProcessPoolExecutor(max_workers=PPTX_WORKERS, mp_context=ctx)
+    return _BUILD_POOL
+
+async def _build_pptx(
+    outline: Outline, contents: bytes, parsed_template: Optional[Dict[str, Any]], reuse_images: bool
+) -> bytes:
+    async with _BUILD_SEM:
+        pool = _get_build_pool()
+        if pool is None:
+            # CPU-bound zip/XML work: run in a worker thread so other requests keep flowing
+            return await asyncio.to_thread(
+                build_presentation,
+                outline=outline,
+                template_bytes=contents,
+                parsed_template=parsed_template,
+                reuse_images=reuse_images,
+            )
+        # Outline pickles as a validated model (no re-validation in the worker)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(pool, build_presentation_job, outline, contents, None, reuse_images)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed). The same input would likely kill the next pool
+            # too, so fail this request (500 upstream); the next build gets a fresh pool.
+            _discard_build_pool(pool)
+            raise
+
+def _discard_build_pool(pool: ProcessPoolExecutor) -> None:
+    global _BUILD_POOL
+    with _BUILD_POOL_LOCK:
+        if _BUILD_POOL is pool:  # concurrent failures of the same pool reset it only once
+            _BUILD_POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
 
 # ---- Slide count post-processing (adapted from the monolithic repo, typed for our Outline) ----
 
@@ -84,37 +362,41 @@ def _normalize_slides(slides: List[OutlineSlide]) -> List[OutlineSlide]:
     for s in slides:
         title = (s.title or "").strip() or "Slide"
         bullets = [str(b).strip() for b in (s.bullets or []) if str(b).strip()]
-        out.append(OutlineSlide(title=title, bullets=bullets, layout=s.layout or "auto", notes=s.notes))
+        # Inputs are already-validated OutlineSlides: skip the validator round-trip
+        out.append(OutlineSlide.model_construct(title=title, bullets=bullets, layout=s.layout or "auto", notes=s.notes))
     return out
 
-def _ensure_min_slides(outline: Outline, min_slides: int, max_slides: int) -> Outline:
-    slides = _normalize_slides(list(outline.slides))
-    # Split dense slides into chunks of up to 3 bullets
-    i = 0
-    while len(slides) < min_slides and i < len(slides) and len(slides) < max_slides:
-        s = slides[i]
-        if len(s.bullets) > 3:
+def _grow_slides(slides: List[OutlineSlide], min_slides: int, max_slides: int) -> List[OutlineSlide]:
+    # Single pass: split dense slides into chunks of up to 3 bullets, appending
+    # continuations right after their parent (no list.insert / tail shifting).
+    out: List[OutlineSlide] = []
+    count = len(slides)  # projected deck size as we go
+    for s in slides:
+        out.append(s)
+        if count < min_slides and count < max_slides and len(s.bullets) > 3:
             extra = s.bullets[3:]
             s.bullets = s.bullets[:3]
-            while extra and len(slides) < min_slides and len(slides) < max_slides:
+            while extra and count < min_slides and count < max_slides:
                 chunk, extra = extra[:3], extra[3:]
-                slides.insert(i + 1, OutlineSlide(title=f"{s.title} (cont.)", bullets=chunk, layout=s.layout))
-                i += 1
-        i += 1
+                out.append(OutlineSlide.model_construct(title=f"{s.title} (cont.)", bullets=chunk, layout=s.layout, notes=None))
+                count += 1
     # Pad with title-only slides if still fewer than min
-    while len(slides) < min_slides and len(slides) < max_slides:
-        slides.append(OutlineSlide(title=f"Slide {len(slides)+1}", bullets=[], layout="auto"))
-    return Outline(title=outline.title, slides=slides[:max_slides], estimated_slide_count=len(slides[:max_slides]))
+    while len(out) < min_slides and len(out) < max_slides:
+        out.append(OutlineSlide.model_construct(title=f"Slide {len(out)+1}", bullets=[], layout="auto", notes=None))
+    return out[:max_slides]
+
+def _ensure_min_slides(outline: Outline, min_slides: int, max_slides: int) -> Outline:
+    slides = _grow_slides(_normalize_slides(list(outline.slides)), min_slides, max_slides)
+    return Outline(title=outline.title, slides=slides, estimated_slide_count=len(slides))
 
 def _enforce_target_slides(outline: Outline, target: int, max_slides: int) -> Outline:
     target = max(1, min(max_slides, int(target)))
     slides = _normalize_slides(list(outline.slides))
 
-    # If too few: grow via ensure_min to target
+    # If too few: grow to target (slides are already normalized)
     if len(slides) < target:
-        grown = _ensure_min_slides(Outline(title=outline.title, slides=slides, estimated_slide_count=len(slides)),
-                                   min_slides=target, max_slides=max_slides)
-        return Outline(title=outline.title, slides=grown.slides[:target], estimated_slide_count=target)
+        grown = _grow_slides(slides, min_slides=target, max_slides=max_slides)
+        return Outline(title=outline.title, slides=grown[:target], estimated_slide_count=target)
 
     # If too many: try merge "(cont.)" style neighbors, else truncate
     if len(slides) > target:
@@ -135,25 +417,69 @@ def _enforce_target_slides(outline: Outline, target: int, max_slides: int) -> Ou
     slides = slides[:target]
     return Outline(title=outline.title, slides=slides, estimated_slide_count=len(slides))
 
+def _fit_slide_count(outline: Outline, num_slides: Optional[int]) -> Outline:
+    """Apply the target/min slide count; outlines already in shape skip the rebuild."""
+    n = len(outline.slides)
+    if num_slides:
+        canonical = n == max(1, min(MAX_SLIDES, int(num_slides)))
+    else:
+        canonical = MIN_SLIDES <= n <= MAX_SLIDES
+    if canonical:
+        # Validated slides are already normalized; only the count may be stale
+        outline.estimated_slide_count = n
+        return outline
+    if num_slides:
+        return _enforce_target_slides(outline, target=num_slides, max_slides=MAX_SLIDES)
+    return _ensure_min_slides(outline, min_slides=MIN_SLIDES, max_slides=MAX_SLIDES)
+
+
+# ---- Static file cache: read once, re-read only when mtime changes (dev edits) ----
+
+_STATIC_CACHE: Dict[str, Tuple[float, bytes]] = {}
+
+def _read_static_cached(path: str) -> Optional[bytes]:
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    hit = _STATIC_CACHE.get(path)
+    if hit is not None and hit[0] == mtime:
+        return hit[1]
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    _STATIC_CACHE[path] = (mtime, data)
+    return data
+
 
 # ---------------- Routes ----------------
 
 @app.get("/", response_class=HTMLResponse)
 def index() -> HTMLResponse:
     """Serve the client app if packaged; otherwise a minimal placeholder."""
-    index_html_path = os.path.join(static_path, "index.html")
-    if os.path.isfile(index_html_path):
-        with open(index_html_path, "r", encoding="utf-8") as f:
-            return HTMLResponse(f.read())
+    html = _read_static_cached(os.path.join(static_path, "index.html"))
+    if html is not None:
+        return HTMLResponse(html)
     return HTMLResponse("<h1>Auto PPT Generator API</h1><p>POST /api/generate or /api/preview_outline</p>")
 
 @app.head("/")
 def head_root() -> Response:
     return Response(status_code=204)
 
+# Liveness body is rebuilt at most once per second (probes hit this constantly)
+_HEALTHZ_CACHE: Tuple[int, Dict[str, Any]] = (-1, {})
+
 @app.get("/healthz")
 def healthz():
-    return {"ok": True, "ts": datetime.utcnow().isoformat() + "Z"}
+    global _HEALTHZ_CACHE
+    now = int(time.time())
+    sec, body = _HEALTHZ_CACHE
+    if sec != now:
+        body = {"ok": True, "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now))}
+        _HEALTHZ_CACHE = (now, body)
+    return body
 
 # ---- Favicon with tiny PNG fallback (prevents 404 spam) ----
 _FAVICON_FALLBACK_PNG = base64.b64decode(
@@ -161,25 +487,30 @@ _FAVICON_FALLBACK_PNG = base64.b64decode(
 )
 @app.get("/favicon.ico", include_in_schema=False)
 def favicon():
-    path = os.path.join(os.path.dirname(__file__), "..", "web", "favicon.ico")
-    if os.path.exists(path):
-        return FileResponse(path, media_type="image/x-icon")
+    icon = _read_static_cached(os.path.join(static_path, "favicon.ico"))
+    if icon is not None:
+        return Response(content=icon, media_type="image/x-icon")
     return Response(content=_FAVICON_FALLBACK_PNG, media_type="image/png")
 
 # ---- Template inspection (debug/polish) ----
 @app.post("/api/template_info")
-async def template_info(template: UploadFile = File(..., description="PowerPoint file (.pptx/.potx)")):
+async def template_info(
+    template: UploadFile = File(..., description="PowerPoint file (.pptx/.potx)"),
+    detail: str = Form("full", description='"full" or "summary" (layouts without placeholder lists)'),
+):
     name = template.filename or "template.pptx"
     ext = os.path.splitext(name.lower())[1]
     if ext not in ALLOWED_EXTS:
         raise HTTPException(status_code=400, detail=f"Unsupported file type: {ext}. Allowed: {', '.join(ALLOWED_EXTS)}")
-    contents = await template.read()
-    if len(contents) > MAX_FILE_MB * 1024 * 1024:
-        raise HTTPException(status_code=413, detail=f"Template too large. Max is {MAX_FILE_MB} MB.")
-    if not is_safe_pptx(contents):
+    detail = (detail or "full").strip().lower()
+    if detail not in ("full", "summary"):
+        raise HTTPException(status_code=400, detail='detail must be "full" or "summary".')
+    contents = await _read_upload_limited(template, MAX_FILE_MB * 1024 * 1024)
+    # Zip scan + Presentation parse are CPU-bound: keep them off the event loop
+    safe, info = await asyncio.to_thread(inspect_template, contents, include_placeholders=(detail == "full"))
+    if not safe:
         raise HTTPException(status_code=400, detail="Invalid or unsafe PowerPoint file.")
-    info = analyze_template(contents)
-    return JSONResponse(info)
+    return _JSONResponse(info)
 
 # ---- Outline preview (no file build) ----
 @app.post("/api/preview_outline")
@@ -202,33 +533,18 @@ async def preview_outline(
     use_notes = _bool_from_form(include_notes)
 
     # Try LLM first if token supplied; otherwise fallback.
-    try:
-        if api_key:
-            outline_dict = plan_slides_via_llm(
-                text=text,
-                guidance=guidance or "",
-                provider=provider or DEFAULT_PROVIDER,
-                api_key=api_key,
-                model=model or DEFAULT_MODEL,
-                base_url=(base_url or DEFAULT_BASE_URL),
-                include_notes=use_notes,
-            )
-        else:
-            outline_dict = heuristic_outline(text=text, guidance=guidance or "", include_notes=use_notes)
-    except Exception:
-        # Silent fallback: never expose token or provider error details
-        outline_dict = heuristic_outline(text=text, guidance=guidance or "", include_notes=use_notes)
+    outline_dict = await _resolve_outline(
+        text, guidance or "", provider or DEFAULT_PROVIDER, model or DEFAULT_MODEL, api_key, base_url, use_notes
+    )
 
     # Pydantic validation (raises if malformed; handled by FastAPI)
-    outline = Outline(**outline_dict)
+    outline = Outline.model_validate(outline_dict)
 
     # Enforce slide counts for preview if requested
-    if num_slides:
-        outline = _enforce_target_slides(outline, target=num_slides, max_slides=MAX_SLIDES)
-    else:
-        outline = _ensure_min_slides(outline, min_slides=MIN_SLIDES, max_slides=MAX_SLIDES)
+    outline = _fit_slide_count(outline, num_slides)
 
-    return JSONResponse(outline.model_dump())
+    # pydantic-core writes JSON directly; no intermediate dict + stdlib encode
+    return Response(content=outline.model_dump_json(), media_type="application/json")
 
 # ---- Generate PPTX ----
 @app.post("/api/generate")
@@ -256,14 +572,19 @@ async def generate_pptx(
     if ext not in ALLOWED_EXTS:
         raise HTTPException(status_code=400, detail=f"Unsupported file type: {ext}. Allowed: {', '.join(ALLOWED_EXTS)}")
 
-    contents = await template.read()
-    size_mb = len(contents) / (1024 * 1024)
-    if size_mb > MAX_FILE_MB:
-        raise HTTPException(status_code=413, detail=f"Template too large ({size_mb:.1f} MB). Max is {MAX_FILE_MB} MB.")
+    contents = await _read_upload_limited(template, MAX_FILE_MB * 1024 * 1024)
 
     # Structural / safety checks: ensure it's a legitimate PPTX/POTX and not a zip bomb
     try:
-        if not is_safe_pptx(contents):
+        parsed_template: Optional[Dict[str, Any]] = None
+        if PPTX_WORKERS > 0:
+            # Pool workers parse (and cache) the template themselves: only the zip verdict is needed here
+            safe = is_safe_pptx(contents)
+        else:
+            # In-process builds reuse the parsed Presentation (cached by content digest); parse off the loop
+            parsed_template = await asyncio.to_thread(parse_template, contents)
+            safe = parsed_template["safe"]
+        if not safe:
             raise HTTPException(status_code=400, detail="Invalid or unsafe PowerPoint file.")
     except HTTPException:
         raise
@@ -275,54 +596,36 @@ async def generate_pptx(
     text = _clamp_text(text or "")
     use_notes = _bool_from_form(include_notes)
 
-    try:
-        if api_key:
-            outline_dict = plan_slides_via_llm(
-                text=text,
-                guidance=guidance or "",
-                provider=provider or DEFAULT_PROVIDER,
-                api_key=api_key,
-                model=model or DEFAULT_MODEL,
-                base_url=(base_url or DEFAULT_BASE_URL),
-                include_notes=use_notes,
-            )
-        else:
-            outline_dict = heuristic_outline(text=text, guidance=guidance or "", include_notes=use_notes)
-    except Exception:
-        # Defensive fallback if provider errors, never leak key
-        outline_dict = heuristic_outline(text=text, guidance=guidance or "", include_notes=use_notes)
+    outline_dict = await _resolve_outline(
+        text, guidance or "", provider or DEFAULT_PROVIDER, model or DEFAULT_MODEL, api_key, base_url, use_notes
+    )
 
     # Validate structure (pydantic)
-    outline = Outline(**outline_dict)
+    outline = Outline.model_validate(outline_dict)
 
     # ---------- Enforce slide counts ----------
-    if num_slides:
-        outline = _enforce_target_slides(outline, target=num_slides, max_slides=MAX_SLIDES)
-    else:
-        outline = _ensure_min_slides(outline, min_slides=MIN_SLIDES, max_slides=MAX_SLIDES)
+    outline = _fit_slide_count(outline, num_slides)
 
     # ---------- Generate PPTX ----------
     try:
-        pptx_bytes = build_presentation(
-            outline=outline,
-            template_bytes=contents,
-            reuse_images=_bool_from_form(reuse_images),  # builder will handle safe placement & z-order
-        )
+        # builder will handle safe placement & z-order of reused images
+        pptx_bytes = await _build_pptx(outline, contents, parsed_template, _bool_from_form(reuse_images))
     except Exception:
         # Hide internals but give a short, user-friendly message
         raise HTTPException(status_code=500, detail="Failed to build PowerPoint from the provided template.")
 
     # ---------- Stream back as a file download ----------
-    ts = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    ts = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
     base = _safe_filename(f"Auto_PPT_Generator-{ts}")
     filename = f"{base}.pptx"
     headers = {
         "Content-Disposition": f'attachment; filename="{filename}"',
+        "Content-Length": str(len(pptx_bytes)),
         "Cache-Control": "no-store",
     }
 
     return StreamingResponse(
-        io.BytesIO(pptx_bytes),
+        _iter_chunks(pptx_bytes),
         media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation",
         headers=headers,
     )
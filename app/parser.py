@@ -12,7 +12,11 @@ if LLM is unavailable or fails. This parser aims to be:
 from __future__ import annotations
 
 import re
-from typing import Dict, List, Any, Optional
+import sys
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
+from typing import Callable, Dict, Iterable, List, Any, Optional, Sequence, Tuple
 from markdown_it import MarkdownIt
 
 # ---------------- Tunables ----------------
@@ -25,185 +29,276 @@ MIN_SLIDES = 3
 DEFAULT_WORDS_PER_SLIDE = (60, 110)  # (min, max) band for estimating slide counts
 SUB_BULLET_PREFIX = "  • "
 
-ALLOWED_LAYOUTS = {
+# Interned + frozen: membership and equality checks mostly hit the identity fast path
+ALLOWED_LAYOUTS = frozenset(map(sys.intern, (
     "auto",
     "Title and Content",
     "Two Content",
     "Content with Caption",
     "Picture with Caption",
     "Blank",
-}
+)))
 
 # ---------------- Precompiled regexes ----------------
 
 RE_WORD = re.compile(r"\w+")
+RE_WS = re.compile(r"\s+")
 RE_EMAIL = re.compile(r"\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b")
 RE_URL = re.compile(r"\bhttps?://\S+\b")
 RE_OPENAI_KEY = re.compile(r"\bsk-[A-Za-z0-9]{16,}\b")
 RE_HEX_SECRET = re.compile(r"\b[a-fA-F0-9]{32,128}\b")
 RE_PHONE = re.compile(r"\b(?:\+?\d[\d\-\s]{7,}\d)\b")
 RE_CCARD = re.compile(r"\b(?:\d[ -]*?){13,19}\b")  # loose credit-card-ish matcher
-RE_IMG_MD = re.compile(r"!\[.*?\]\(.*?\)")
-RE_LINK_MD = re.compile(r"\[([^\]]+)\]\([^)]+\)")
+RE_DIGIT = re.compile(r"\d")
+# Always-on redactions, applied in this order (earlier passes shape what later ones see),
+# each behind a cheap substring test that every match of that pattern needs
+_SECRET_PASSES = (
+    (RE_EMAIL, lambda t: "@" in t),
+    (RE_URL, lambda t: "://" in t),
+    (RE_OPENAI_KEY, lambda t: "sk-" in t),
+    (RE_HEX_SECRET, lambda t: len(t) >= 32),
+    (RE_PHONE, lambda t: RE_DIGIT.search(t) is not None),
+)
 RE_HTML_TAG = re.compile(r"<[^>]+>")
+# Images, links and tags in one scan (a link label may not start with an image, which is dropped instead)
+RE_MARKUP = re.compile(r"(?:!\[.*?\]\(.*?\))|\[(?!!\[)([^\]]+)\]\([^)]+\)|(?:<[^>]+>)")
+# Legal + medical disclaimer triggers in one case-insensitive scan
+RE_DISCLAIMER = re.compile(
+    r"\b(?:(?P<legal>policy|compliance|gdpr|hipaa|terms|contract|license|liability)"
+    r"|(?P<medical>clinical|diagnos|treatment|adverse|contraindication|guideline|prescrib))\b",
+    re.I,
+)
 
 # Multilingual/robust sentence splitter (., !, ?, Chinese/Japanese punctuation)
-RE_SENTENCES = re.compile(r"(?<=[。！？!?\.])\s+|(?<=\.)\s+|(?<=\?)\s+|(?<=!)\s+")
+RE_SENTENCES = re.compile(r"(?<=[。！？!?.])\s+")
+_SENTENCE_PUNCT = "。！？!?."  # punctuation-only fragments between splits are dropped
+
+# ---------------- Markdown ----------------
+
+# Rule chains are compiled once; parse() keeps all state per call.
+# Handlers only read block-level .content, so inline tokenization (children) is skipped.
+_MD = MarkdownIt().disable(["inline", "text_join"])
+
+@lru_cache(maxsize=32)
+def _parse_md(raw: str) -> List[Any]:
+    # Callers only read tokens (type/content/info); never mutate the cached list
+    return _MD.parse(raw)
 
 # ---------------- Utilities ----------------
 
 def _word_count(s: str) -> int:
-    return len(RE_WORD.findall(s or ""))
+    # Count matches without materializing the word list
+    return sum(1 for _ in RE_WORD.finditer(s or ""))
 
 def _collapse_ws(s: str) -> str:
-    return re.sub(r"\s+", " ", (s or "").strip())
+    s = s or ""
+    # Already-collapsed text skips the regex: isprintable() rules out every whitespace char but " "
+    if s.isprintable() and "  " not in s and s[:1] != " " and s[-1:] != " ":
+        return s
+    return RE_WS.sub(" ", s.strip())
 
 def _truncate(s: str, n: int) -> str:
     s = _collapse_ws(s or "")
     return s if len(s) <= n else s[: max(0, n - 1)].rstrip() + "…"
 
-def _chunks(lst: List[str], n: int):
-    for i in range(0, len(lst), n):
-        yield lst[i : i + n]
-
-def _dedup_preserve_order(items: List[str]) -> List[str]:
-    seen = set()
-    out: List[str] = []
-    for x in items:
-        if x not in seen:
-            seen.add(x)
-            out.append(x)
-    return out
+def _dedup_preserve_order(items: Iterable[str]) -> List[str]:
+    # dicts keep insertion order: first occurrence wins, deduped in C
+    return list(dict.fromkeys(items))
+
+def _markup_repl(m: re.Match) -> str:
+    label = m.group(1)
+    return RE_HTML_TAG.sub("", label) if label is not None else ""
 
 def _strip_markup(text: str) -> str:
     """Remove MD images/links and HTML tags but keep visible label text."""
-    t = RE_IMG_MD.sub("", text or "")
-    t = RE_LINK_MD.sub(r"\1", t)
-    t = RE_HTML_TAG.sub("", t)
-    return t
+    # Every markup form starts with "[" (links, "![" images) or "<" (tags): plain text skips the regex
+    if not text or ("[" not in text and "<" not in text):
+        return text or ""
+    return RE_MARKUP.sub(_markup_repl, text)
 
 def _scrub_sensitive(text: str) -> str:
     """Redact obvious secrets/PII unless essential."""
     if not text:
         return text
     t = text
-    t = RE_EMAIL.sub("[…]", t)
-    t = RE_URL.sub("[…]", t)
-    t = RE_OPENAI_KEY.sub("[…]", t)
-    t = RE_HEX_SECRET.sub("[…]", t)
-    t = RE_PHONE.sub("[…]", t)
+    for pattern, may_match in _SECRET_PASSES:
+        if may_match(t):
+            t = pattern.sub("[…]", t)
     # Be conservative on credit cards; only scrub when multiple groups present
-    if len(re.findall(r"\d", t)) >= 12:
+    if len(RE_DIGIT.findall(t)) >= 12:
         t = RE_CCARD.sub("[…]", t)
     return t
 
-def _likely_legal(text: str) -> bool:
-    return bool(re.search(r"\b(policy|compliance|gdpr|hipaa|terms|contract|license|liability)\b", text, re.I))
+def _clean_bullet(text: str, limit: int = MAX_CHARS_PER_BULLET) -> str:
+    """Markup strip → whitespace collapse + truncate → redaction, each a single scan."""
+    return _scrub_sensitive(_truncate(_strip_markup(text), limit))
+
+def _disclaimer_kind(text: str) -> Optional[str]:
+    """'legal' / 'medical' for the first trigger term in text, else None."""
+    m = RE_DISCLAIMER.search(text or "")
+    return m.lastgroup if m else None
+
+def _normalize_layout(layout: Optional[str]) -> str:
+    """Canonical layout name, or "auto" for anything unknown."""
+    return layout if layout in ALLOWED_LAYOUTS else "auto"
 
-def _likely_medical(text: str) -> bool:
-    return bool(re.search(r"\b(clinical|diagnos|treatment|adverse|contraindication|guideline|prescrib)\b", text, re.I))
+def _layout_for_bullets(n_bullets: int, preferred: str) -> str:
+    """Two columns for dense slides; otherwise the preferred layout (normalized)."""
+    return "Two Content" if n_bullets > MAX_BULLETS_PER_SLIDE else _normalize_layout(preferred)
 
 def _has_meaningful_notes(include_notes: bool, notes_text: str) -> bool:
     return include_notes and bool((notes_text or "").strip())
 
 # ---------------- Archetypes ----------------
 
+# Archetype keyword tiers (checked in order; first tier hit wins, wherever it sits in the text)
+_ARCHETYPE_TIERS = (
+    (frozenset({"investor", "pitch"}), "investor"),
+    (frozenset({"sop", "runbook", "standard operating"}), "sop"),
+    (frozenset({"sales"}), "sales"),
+    (frozenset({"research", "conference", "talk", "paper"}), "research"),
+    (frozenset({"lesson", "quiz", "lecture", "teaching"}), "lesson"),
+)
+# Every keyword in one scan (same lookahead trick as RE_GUIDANCE)
+RE_ARCHETYPE = re.compile(
+    "(?=("
+    + "|".join(sorted({re.escape(k) for ks, _ in _ARCHETYPE_TIERS for k in ks}, key=len, reverse=True))
+    + "))"
+)
+
+@lru_cache(maxsize=64)
 def _detect_archetype(guidance: str) -> Optional[str]:
-    g = (guidance or "").lower()
-    if "investor" in g or "pitch" in g:
-        return "investor"
-    if "sop" in g or "runbook" in g or "standard operating" in g:
-        return "sop"
-    if "sales" in g:
-        return "sales"
-    if "research" in g or "conference" in g or "talk" in g or "paper" in g:
-        return "research"
-    if "lesson" in g or "quiz" in g or "lecture" in g or "teaching" in g:
-        return "lesson"
-    return None
-
-def _archetype_sections(kind: str) -> List[str]:
-    if kind == "investor":
-        return [
-            "Problem", "Solution", "Market", "Product", "Moat",
-            "Go-To-Market", "Traction", "Business Model", "Competition",
-            "Team", "Financials", "Ask", "Roadmap"
-        ]
-    if kind == "sop":
-        return ["Purpose", "Scope", "Prerequisites", "Procedure", "Validation/Checks", "Rollback/Recovery", "Contact/On-call"]
-    if kind == "sales":
-        return ["Overview", "Value Proposition", "ROI/Impact", "Case Studies", "Pricing", "Call to Action"]
-    if kind == "research":
-        return ["Background", "Methods", "Results", "Limitations", "Future Work", "References/Acknowledgements"]
-    if kind == "lesson":
-        return ["Objectives", "Key Concepts", "Examples", "Practice Questions", "Summary"]
-    return []
-
-def _keyword_bucket(sentence: str, sections: List[str]) -> int:
-    """Heuristic mapping of a sentence to a section index via keywords; else round-robin by hash."""
-    s = (sentence or "").lower()
-    hints = {
-        "problem": ["problem", "pain", "gap"],
-        "solution": ["solution", "approach", "proposal"],
-        "market": ["market", "tam", "sam", "som"],  # fixed acronyms
-        "product": ["product", "feature", "prototype", "architecture"],
-        "moat": ["moat", "defensib", "advantage", "ip", "patent"],
-        "go-to-market": ["gtm", "marketing", "sales", "channel"],
-        "traction": ["traction", "revenue", "users", "growth"],
-        "business model": ["pricing", "business model", "subscription", "margin"],
-        "competition": ["competitor", "competition", "alternative"],
-        "team": ["team", "hiring", "founder"],
-        "financials": ["financial", "projection", "cost", "profit", "loss", "burn"],
-        "ask": ["ask", "raise", "fund", "investment"],
-        "roadmap": ["roadmap", "timeline", "milestone"],
-        "purpose": ["purpose", "objective"],
-        "scope": ["scope", "coverage"],
-        "prerequisites": ["prerequisite", "requirement", "dependency"],
-        "procedure": ["step", "procedure", "instruction"],
-        "validation/checks": ["validate", "check", "verify"],
-        "rollback/recovery": ["rollback", "recovery", "restore"],
-        "contact/on-call": ["contact", "on-call", "escalation"],
-        "value proposition": ["value", "benefit", "advantage", "roi"],
-        "roi/impact": ["roi", "impact", "benefit"],
-        "case studies": ["case", "study", "example"],
-        "call to action": ["cta", "contact", "next step", "trial"],
-        "background": ["background", "intro", "motivation"],
-        "methods": ["method", "algorithm", "procedure"],
-        "results": ["result", "finding", "outcome"],
-        "limitations": ["limit", "constraint", "threat"],
-        "future work": ["future", "next", "expand"],
-        "references/acknowledgements": ["reference", "cite", "acknowledgement"],
-        "objectives": ["objective", "goal", "outcome"],
-        "key concepts": ["concept", "definition", "theory"],
-        "examples": ["example", "illustration"],
-        "practice questions": ["question", "quiz", "mcq"],
-        "summary": ["summary", "conclusion", "recap"],
-    }
+    found = set(RE_ARCHETYPE.findall(guidance.lower())) if guidance else set()
+    return next((name for ks, name in _ARCHETYPE_TIERS if found & ks), None)
+
+# Static section lists per archetype (tuples: shared, never rebuilt per call)
+_ARCHETYPE_SECTIONS: Dict[str, Tuple[str, ...]] = {
+    "investor": (
+        "Problem", "Solution", "Market", "Product", "Moat",
+        "Go-To-Market", "Traction", "Business Model", "Competition",
+        "Team", "Financials", "Ask", "Roadmap"
+    ),
+    "sop": ("Purpose", "Scope", "Prerequisites", "Procedure", "Validation/Checks", "Rollback/Recovery", "Contact/On-call"),
+    "sales": ("Overview", "Value Proposition", "ROI/Impact", "Case Studies", "Pricing", "Call to Action"),
+    "research": ("Background", "Methods", "Results", "Limitations", "Future Work", "References/Acknowledgements"),
+    "lesson": ("Objectives", "Key Concepts", "Examples", "Practice Questions", "Summary"),
+}
+
+def _archetype_sections(kind: str) -> Tuple[str, ...]:
+    return _ARCHETYPE_SECTIONS.get(kind, ())
+
+# Section keyword hints (keys are lowercased section names)
+_SECTION_HINTS: Dict[str, List[str]] = {
+    "problem": ["problem", "pain", "gap"],
+    "solution": ["solution", "approach", "proposal"],
+    "market": ["market", "tam", "sam", "som"],  # fixed acronyms
+    "product": ["product", "feature", "prototype", "architecture"],
+    "moat": ["moat", "defensib", "advantage", "ip", "patent"],
+    "go-to-market": ["gtm", "marketing", "sales", "channel"],
+    "traction": ["traction", "revenue", "users", "growth"],
+    "business model": ["pricing", "business model", "subscription", "margin"],
+    "competition": ["competitor", "competition", "alternative"],
+    "team": ["team", "hiring", "founder"],
+    "financials": ["financial", "projection", "cost", "profit", "loss", "burn"],
+    "ask": ["ask", "raise", "fund", "investment"],
+    "roadmap": ["roadmap", "timeline", "milestone"],
+    "purpose": ["purpose", "objective"],
+    "scope": ["scope", "coverage"],
+    "prerequisites": ["prerequisite", "requirement", "dependency"],
+    "procedure": ["step", "procedure", "instruction"],
+    "validation/checks": ["validate", "check", "verify"],
+    "rollback/recovery": ["rollback", "recovery", "restore"],
+    "contact/on-call": ["contact", "on-call", "escalation"],
+    "value proposition": ["value", "benefit", "advantage", "roi"],
+    "roi/impact": ["roi", "impact", "benefit"],
+    "case studies": ["case", "study", "example"],
+    "call to action": ["cta", "contact", "next step", "trial"],
+    "background": ["background", "intro", "motivation"],
+    "methods": ["method", "algorithm", "procedure"],
+    "results": ["result", "finding", "outcome"],
+    "limitations": ["limit", "constraint", "threat"],
+    "future work": ["future", "next", "expand"],
+    "references/acknowledgements": ["reference", "cite", "acknowledgement"],
+    "objectives": ["objective", "goal", "outcome"],
+    "key concepts": ["concept", "definition", "theory"],
+    "examples": ["example", "illustration"],
+    "practice questions": ["question", "quiz", "mcq"],
+    "summary": ["summary", "conclusion", "recap"],
+}
+
+# Compiled matchers per section list: sentence -> lowest matching section index (or -1)
+_BUCKET_MATCHERS: Dict[Tuple[str, ...], Callable[[str], int]] = {}
+
+def _bucket_matcher(sections: Tuple[str, ...]) -> Callable[[str], int]:
+    matcher = _BUCKET_MATCHERS.get(sections)
+    if matcher is not None:
+        return matcher
+
+    # keyword -> first section (in section order) that lists it
+    kw_index: Dict[str, int] = {}
     for i, sec in enumerate(sections):
-        need = hints.get(sec.lower(), [])
-        if any(k in s for k in need):
-            return i
-    return hash(s) % max(1, len(sections))
+        for k in _SECTION_HINTS.get(sec.lower(), []):
+            kw_index.setdefault(k, i)
+
+    if not kw_index:
+        def matcher(s: str) -> int:
+            return -1
+    else:
+        # Zero-width lookahead reports a keyword at every start position (overlaps included);
+        # alternatives are ordered by section so each position yields its lowest section.
+        ordered = sorted(kw_index, key=lambda k: (kw_index[k], -len(k)))
+        pattern = re.compile("(?=(" + "|".join(map(re.escape, ordered)) + "))")
+
+        def matcher(s: str) -> int:
+            best = -1
+            for m in pattern.finditer(s):
+                i = kw_index[m.group(1)]
+                if best < 0 or i < best:
+                    best = i
+                    if i == 0:
+                        break
+            return best
+
+    _BUCKET_MATCHERS[sections] = matcher
+    return matcher
+
+def _keyword_bucket(sentence: str, sections: Sequence[str]) -> Optional[int]:
+    """Heuristic mapping of a sentence to a section index via keywords; None if nothing matches."""
+    idx = _bucket_matcher(tuple(sections))((sentence or "").lower())  # tuple(): no-op for tuple input
+    return idx if idx >= 0 else None
 
 # ---------------- Guidance influences ----------------
 
-def _layout_bias_from_guidance(guidance: str) -> str:
-    g = (guidance or "").lower()
-    if any(k in g for k in ("visual", "image", "design-heavy", "poster")):
-        return "Picture with Caption"
-    if any(k in g for k in ("executive", "summary", "tl;dr")):
-        return "Content with Caption"
-    if any(k in g for k in ("technical", "deep dive", "details")):
-        return "Two Content"
-    return "auto"
-
-def _bullet_target_from_guidance(guidance: str) -> int:
-    g = (guidance or "").lower()
-    if any(k in g for k in ("executive", "brief", "summary")):
-        return 3
-    if any(k in g for k in ("technical", "detailed", "thorough")):
-        return 6
-    return 5
+# Layout-bias and bullet-target keyword tiers (checked in order; first tier hit wins)
+_GUIDANCE_LAYOUT_TIERS = (
+    (frozenset({"visual", "image", "design-heavy", "poster"}), "Picture with Caption"),
+    (frozenset({"executive", "summary", "tl;dr"}), "Content with Caption"),
+    (frozenset({"technical", "deep dive", "details"}), "Two Content"),
+)
+_GUIDANCE_BULLET_TIERS = (
+    (frozenset({"executive", "brief", "summary"}), 3),
+    (frozenset({"technical", "detailed", "thorough"}), 6),
+)
+# Every keyword in one scan; the zero-width lookahead also reports overlapping hits ("detailsummary")
+RE_GUIDANCE = re.compile(
+    "(?=("
+    + "|".join(
+        sorted(
+            {re.escape(k) for tiers in (_GUIDANCE_LAYOUT_TIERS, _GUIDANCE_BULLET_TIERS) for ks, _ in tiers for k in ks},
+            key=len,
+            reverse=True,
+        )
+    )
+    + "))"
+)
+
+@lru_cache(maxsize=64)
+def _parse_guidance(guidance: str) -> Tuple[str, int]:
+    """(layout bias, bullets-per-slide target) from free-form guidance; substring match, case-insensitive."""
+    found = set(RE_GUIDANCE.findall(guidance.lower())) if guidance else set()
+    layout = next((name for ks, name in _GUIDANCE_LAYOUT_TIERS if found & ks), "auto")
+    target = next((n for ks, n in _GUIDANCE_BULLET_TIERS if found & ks), 5)
+    return layout, target
 
 # ---------------- Char-budget enforcement ----------------
 
@@ -211,21 +306,16 @@ def _split_by_char_budget(title: str, bullets: List[str]) -> List[Dict[str, Any]
     """
     If bullets collectively exceed MAX_CHARS_PER_SLIDE, split into multiple slides.
     """
+    items = [b for b in ((b or "").strip() for b in bullets) if b]
+    # Cumulative lengths: each cut is a binary search instead of a running-sum loop
+    cum = list(accumulate(map(len, items)))
     out: List[Dict[str, Any]] = []
-    buf: List[str] = []
-    running = 0
-    for b in bullets:
-        b = (b or "").strip()
-        if not b:
-            continue
-        blen = len(b)
-        if running + blen > MAX_CHARS_PER_SLIDE and buf:
-            out.append({"title": title, "bullets": buf})
-            buf, running = [], 0
-        buf.append(b)
-        running += blen
-    if buf:
-        out.append({"title": title, "bullets": buf})
+    start, offset = 0, 0
+    while start < len(items):
+        # Greedy fill; a slide always takes at least one bullet even if it alone is over budget
+        end = bisect_right(cum, offset + MAX_CHARS_PER_SLIDE, start + 1)
+        out.append({"title": title, "bullets": items[start:end]})
+        offset, start = cum[end - 1], end
     # add (cont.) to subsequent titles
     for i in range(1, len(out)):
         out[i]["title"] = f"{title} (cont.)"
@@ -245,6 +335,120 @@ def _generate_notes_from_bullets(bullets: List[str]) -> str:
         return _truncate(f"Key points: {sent}.", 380)
     return _truncate(sent, 380)
 
+# ---------------- Padding ----------------
+
+def _padding_slide(idx: int, include_notes: bool) -> Dict[str, Any]:
+    pad: Dict[str, Any] = {"title": f"Slide {idx}", "bullets": [], "layout": "Blank"}
+    if include_notes:
+        pad["notes"] = ""
+    return pad
+
+# ---------------- Markdown token handlers ----------------
+
+class _WalkState:
+    """Mutable state threaded through the token handlers of heuristic_outline."""
+
+    __slots__ = ("current_title", "current_bullets", "list_level", "bullet_target", "flush")
+
+    def __init__(self, bullet_target: int, flush: Callable[[], None]) -> None:
+        self.current_title: Optional[str] = None
+        self.current_bullets: List[str] = []
+        self.list_level = 0
+        self.bullet_target = bullet_target
+        self.flush = flush
+
+# Each handler takes (tokens, i, state) and returns the index of the next token to visit.
+
+def _h_heading(tokens: List[Any], i: int, st: _WalkState) -> int:
+    st.flush()
+    # Next inline contains the heading text
+    if i + 1 < len(tokens) and tokens[i + 1].type == "inline":
+        st.current_title = _truncate(_strip_markup(tokens[i + 1].content), 80)
+        return i + 2
+    return i + 1
+
+def _h_list_open(tokens: List[Any], i: int, st: _WalkState) -> int:
+    st.list_level += 1
+    return i + 1
+
+def _h_list_close(tokens: List[Any], i: int, st: _WalkState) -> int:
+    st.list_level = max(0, st.list_level - 1)
+    return i + 1
+
+def _h_list_item(tokens: List[Any], i: int, st: _WalkState) -> int:
+    # Eat everything until list_item_close and capture inline text
+    L = len(tokens)
+    j = i + 1
+    parts: List[str] = []  # join once: no quadratic str +=
+    while j < L and tokens[j].type not in ("list_item_close", "list_item_open"):
+        if tokens[j].type == "inline":
+            parts.append(tokens[j].content)
+        j += 1
+    text_buf = _collapse_ws(_strip_markup(" ".join(parts)))
+    if text_buf:
+        prefix = SUB_BULLET_PREFIX if st.list_level >= 2 else ""
+        st.current_bullets.append(prefix + text_buf)
+    return j
+
+def _h_blockquote(tokens: List[Any], i: int, st: _WalkState) -> int:
+    # Capture the quoted inline text as a bullet prefixed with “Quote:”
+    L = len(tokens)
+    j = i + 1
+    parts: List[str] = []
+    while j < L and tokens[j].type != "blockquote_close":
+        if tokens[j].type == "inline":
+            parts.append(tokens[j].content)
+        j += 1
+    quote_clean = _collapse_ws(_strip_markup(" ".join(parts)))
+    if quote_clean:
+        st.current_bullets.append(f"Quote: {quote_clean}")
+    return j
+
+def _h_table(tokens: List[Any], i: int, st: _WalkState) -> int:
+    # Summarize tables as lines captured until table_close
+    L = len(tokens)
+    j = i + 1
+    rows: List[str] = []
+    while j < L and tokens[j].type != "table_close":
+        if tokens[j].type == "inline":
+            row = _collapse_ws(_strip_markup(tokens[j].content))
+            if row:
+                rows.append(row)
+        j += 1
+    if rows:
+        for r in rows[: st.bullet_target + 2]:
+            st.current_bullets.append(_truncate(r, MAX_CHARS_PER_BULLET))
+    return j
+
+def _h_paragraph(tokens: List[Any], i: int, st: _WalkState) -> int:
+    if i + 1 < len(tokens) and tokens[i + 1].type == "inline":
+        content = _strip_markup(tokens[i + 1].content)
+        stripped = _collapse_ws(content)
+        if stripped:
+            st.current_bullets.append(stripped)
+    return i + 1
+
+def _h_fence(tokens: List[Any], i: int, st: _WalkState) -> int:  # code block
+    t = tokens[i]
+    lang = (t.info or "").strip() or "code"
+    code_lines = (t.content or "").splitlines()
+    approx = len(code_lines)
+    st.current_bullets.append(f"Code: {lang} block (~{approx} lines) – summary unavailable")
+    return i + 1
+
+_HANDLERS: Dict[str, Callable[[List[Any], int, _WalkState], int]] = {
+    "heading_open": _h_heading,
+    "bullet_list_open": _h_list_open,
+    "ordered_list_open": _h_list_open,
+    "bullet_list_close": _h_list_close,
+    "ordered_list_close": _h_list_close,
+    "list_item_open": _h_list_item,
+    "blockquote_open": _h_blockquote,
+    "table_open": _h_table,
+    "paragraph_open": _h_paragraph,
+    "fence": _h_fence,
+}
+
 # ---------------- Core Parser ----------------
 
 def heuristic_outline(text: str, guidance: str = "", include_notes: bool = False) -> Dict[str, Any]:
@@ -256,146 +460,78 @@ def heuristic_outline(text: str, guidance: str = "", include_notes: bool = False
     - Enforce per-slide char budgets and sensible layouts.
     """
     raw = text or ""
-    md = MarkdownIt()
-    tokens = md.parse(raw)
+    if not raw or raw.isspace():
+        # Nothing to parse: same padding deck the full pipeline would produce, minus the work
+        pads = [_padding_slide(i, include_notes) for i in range(1, MIN_SLIDES + 1)]
+        return {"title": pads[0]["title"], "slides": pads, "estimated_slide_count": len(pads)}
+    tokens = _parse_md(raw)
 
     slides: List[Dict[str, Any]] = []
-    current_title: Optional[str] = None
-    current_bullets: List[str] = []
-    list_level = 0
 
     # Guidance biases
-    guidance_layout_bias = _layout_bias_from_guidance(guidance)
-    guidance_bullet_target = _bullet_target_from_guidance(guidance)
+    guidance_layout_bias, guidance_bullet_target = _parse_guidance(guidance or "")
+
+    # Boilerplate repeats across long docs: clean each distinct bullet text once per call
+    clean_memo: Dict[str, str] = {}
+
+    def clean(b: str) -> str:
+        c = clean_memo.get(b)
+        if c is None:
+            c = clean_memo[b] = _clean_bullet(b)
+        return c
 
     def flush_slide():
-        nonlocal current_title, current_bullets
+        current_title, current_bullets = st.current_title, st.current_bullets
         if not (current_title or current_bullets):
             return
-        # Clean bullets
-        bullets = [
-            _scrub_sensitive(_truncate(_strip_markup(b), MAX_CHARS_PER_BULLET))
-            for b in current_bullets
-            if b and b.strip()
-        ]
-        bullets = _dedup_preserve_order([b for b in bullets if b.strip()])
+        # Clean + drop empties + dedup in one streamed pass (cleaned text is already collapsed)
+        bullets = _dedup_preserve_order(c for c in map(clean, current_bullets) if c)
 
         # Enforce bullet cap & char budget, possibly splitting into continuation slides
-        if not bullets:
-            bullets = []
         split = _split_by_char_budget(current_title or "Overview", bullets)
         for idx, part in enumerate(split):
-            chosen_layout = "Two Content" if len(part["bullets"]) > MAX_BULLETS_PER_SLIDE else "auto"
-            # Apply gentle guidance bias if "auto"
-            if chosen_layout == "auto" and guidance_layout_bias in ALLOWED_LAYOUTS:
-                chosen_layout = guidance_layout_bias
+            # Apply gentle guidance bias unless the slide needs two columns
             slide: Dict[str, Any] = {
                 "title": part["title"] if idx == 0 else f"{(current_title or 'Overview')} (cont.)",
                 "bullets": part["bullets"][:MAX_BULLETS_PER_SLIDE],
-                "layout": chosen_layout if chosen_layout in ALLOWED_LAYOUTS else "auto",
+                "layout": _layout_for_bullets(len(part["bullets"]), guidance_layout_bias),
             }
             if include_notes:
                 slide["notes"] = _generate_notes_from_bullets(slide["bullets"])
             slides.append(slide)
 
-        current_title, current_bullets = None, []
+        st.current_title, st.current_bullets = None, []
 
-    # Pass 1: Markdown-aware extraction
+    st = _WalkState(guidance_bullet_target, flush_slide)
+
+    # Pass 1: Markdown-aware extraction (table-driven: one dict lookup per token)
+    handlers = _HANDLERS
     i = 0
     L = len(tokens)
     while i < L:
-        t = tokens[i]
-
-        if t.type == "heading_open":
-            flush_slide()
-            # Next inline contains the heading text
-            if i + 1 < L and tokens[i + 1].type == "inline":
-                current_title = _truncate(_strip_markup(tokens[i + 1].content), 80)
-                i += 2
-                continue
-
-        if t.type in ("bullet_list_open", "ordered_list_open"):
-            list_level += 1
-
-        elif t.type in ("bullet_list_close", "ordered_list_close"):
-            list_level = max(0, list_level - 1)
-
-        elif t.type == "list_item_open":
-            # Eat everything until list_item_close and capture inline text
-            j = i + 1
-            text_buf = ""
-            while j < L and tokens[j].type not in ("list_item_close", "list_item_open"):
-                if tokens[j].type == "inline":
-                    text_buf += " " + tokens[j].content
-                j += 1
-            text_buf = _collapse_ws(_strip_markup(text_buf))
-            if text_buf:
-                prefix = SUB_BULLET_PREFIX if list_level >= 2 else ""
-                current_bullets.append(prefix + text_buf)
-            i = j
-            continue
-
-        elif t.type == "blockquote_open":
-            # Capture the quoted inline text as a bullet prefixed with “Quote:”
-            j = i + 1
-            quote_buf = ""
-            while j < L and tokens[j].type != "blockquote_close":
-                if tokens[j].type == "inline":
-                    quote_buf += " " + tokens[j].content
-                j += 1
-            quote_clean = _collapse_ws(_strip_markup(quote_buf))
-            if quote_clean:
-                current_bullets.append(f"Quote: {quote_clean}")
-            i = j
-            continue
-
-        elif t.type == "table_open":
-            # Summarize tables as lines captured until table_close
-            j = i + 1
-            rows: List[str] = []
-            row = ""
-            while j < L and tokens[j].type != "table_close":
-                if tokens[j].type == "inline":
-                    row = _collapse_ws(_strip_markup(tokens[j].content))
-                    if row:
-                        rows.append(row)
-                j += 1
-            if rows:
-                for r in rows[: guidance_bullet_target + 2]:
-                    current_bullets.append(_truncate(r, MAX_CHARS_PER_BULLET))
-            i = j
-            continue
-
-        elif t.type == "paragraph_open":
-            if i + 1 < L and tokens[i + 1].type == "inline":
-                content = _strip_markup(tokens[i + 1].content)
-                stripped = _collapse_ws(content)
-                if stripped:
-                    current_bullets.append(stripped)
-
-        elif t.type == "fence":  # code block
-            lang = (t.info or "").strip() or "code"
-            code_lines = (t.content or "").splitlines()
-            approx = len(code_lines)
-            current_bullets.append(f"Code: {lang} block (~{approx} lines) – summary unavailable")
-
-        i += 1
+        handler = handlers.get(tokens[i].type)
+        i = handler(tokens, i, st) if handler is not None else i + 1
 
     flush_slide()
 
     # If we produced nothing meaningful, try archetype bucketing or sentence chunking
     have_real_titles = any(s["title"] and s["title"] not in ("Overview", "Slide") for s in slides)
-    archetype = _detect_archetype(guidance)
+    archetype = _detect_archetype(guidance or "")
 
     if not slides or not have_real_titles:
-        sentences = [s for s in RE_SENTENCES.split(_collapse_ws(raw)) if s and not re.fullmatch(r"[.!?]+", s)]
+        sentences = [s for s in RE_SENTENCES.split(_collapse_ws(raw)) if s and s.strip(_SENTENCE_PUNCT)]
         # Archetype mapping first
         if archetype:
             sections = _archetype_sections(archetype)
             bucketed: List[List[str]] = [[] for _ in sections] if sections else []
             if sections:
+                rr = 0  # deterministic round-robin for sentences without a keyword hit
                 for s in sentences:
-                    bucketed[_keyword_bucket(s, sections)].append(_truncate(s, MAX_CHARS_PER_BULLET))
+                    idx = _keyword_bucket(s, sections)
+                    if idx is None:
+                        idx = rr
+                        rr = (rr + 1) % len(sections)
+                    bucketed[idx].append(clean(s))
                 slides = []
                 for sec, group in zip(sections, bucketed):
                     if not group:
@@ -404,13 +540,10 @@ def heuristic_outline(text: str, guidance: str = "", include_notes: bool = False
                     # char-budget split
                     split_parts = _split_by_char_budget(sec, bullets)
                     for part in split_parts:
-                        chosen_layout = "Two Content" if len(part["bullets"]) > MAX_BULLETS_PER_SLIDE else guidance_layout_bias
-                        if chosen_layout not in ALLOWED_LAYOUTS:
-                            chosen_layout = "auto"
                         slides.append({
                             "title": part["title"],
                             "bullets": part["bullets"][:MAX_BULLETS_PER_SLIDE],
-                            "layout": chosen_layout,
+                            "layout": _layout_for_bullets(len(part["bullets"]), guidance_layout_bias),
                             **({"notes": _generate_notes_from_bullets(part['bullets'])} if include_notes else {}),
                         })
         # Generic chunking if still empty
@@ -423,11 +556,9 @@ def heuristic_outline(text: str, guidance: str = "", include_notes: bool = False
                 sentences = [raw] if raw.strip() else []
             group_size = max(1, len(sentences) // max(1, approx_slides))
             slides = []
-            for idx, group in enumerate(_chunks(sentences, group_size), 1):
-                bul = []
-                for sent in group:
-                    if sent:
-                        bul.append(_truncate(_strip_markup(sent), MAX_CHARS_PER_BULLET))
+            for idx, start in enumerate(range(0, len(sentences), group_size), 1):
+                # Chunk + clean in one pass over each index window
+                bul = [clean(sent) for sent in sentences[start : start + group_size] if sent]
                 if bul:
                     # enforce char budget again
                     parts = _split_by_char_budget(f"Section {idx}", bul)
@@ -435,13 +566,12 @@ def heuristic_outline(text: str, guidance: str = "", include_notes: bool = False
                         slides.append({
                             "title": p["title"],
                             "bullets": _dedup_preserve_order(p["bullets"])[:MAX_BULLETS_PER_SLIDE],
-                            "layout": guidance_layout_bias if guidance_layout_bias in ALLOWED_LAYOUTS else "auto",
+                            "layout": _normalize_layout(guidance_layout_bias),
                             **({"notes": _generate_notes_from_bullets(p['bullets'])} if include_notes else {}),
                         })
 
     # Disclaimers: legal/medical
-    raw_lower = (raw or "").lower()
-    if _likely_legal(raw_lower) or _likely_medical(raw_lower):
+    if _disclaimer_kind(raw):
         disclaimer = "Informational only; not legal/medical advice."
         if include_notes and slides:
             slides[0]["notes"] = _truncate(
@@ -457,17 +587,13 @@ def heuristic_outline(text: str, guidance: str = "", include_notes: bool = False
     cleaned: List[Dict[str, Any]] = []
     for s in slides:
         title = _truncate(s.get("title") or "Slide", 80)
-        bullets = [b for b in (s.get("bullets") or []) if b and b.strip()]
-        bullets = [_scrub_sensitive(_truncate(b, MAX_CHARS_PER_BULLET)) for b in bullets]
-        bullets = _dedup_preserve_order(bullets)
+        # Every producer emits bullets through _clean_bullet: only filter + dedup here
+        bullets = _dedup_preserve_order(b for b in (s.get("bullets") or []) if b and b.strip())
 
-        layout = s.get("layout") or "auto"
-        if layout not in ALLOWED_LAYOUTS:
-            layout = "auto"
+        layout = _normalize_layout(s.get("layout"))
         if _has_meaningful_notes(include_notes, s.get("notes", "")) and layout == "auto":
             layout = "Content with Caption"
-        if len(bullets) > MAX_BULLETS_PER_SLIDE and layout != "Two Content":
-            layout = "Two Content"
+        layout = _layout_for_bullets(len(bullets), layout)
 
         out = {"title": title, "bullets": bullets[:MAX_BULLETS_PER_SLIDE], "layout": layout}
         if include_notes:
@@ -493,11 +619,7 @@ def heuristic_outline(text: str, guidance: str = "", include_notes: bool = False
                     cont["notes"] = _generate_notes_from_bullets(cont["bullets"])
                 out.append(cont)
         while len(out) < MIN_SLIDES:
-            pad_idx = len(out) + 1
-            pad = {"title": f"Slide {pad_idx}", "bullets": [], "layout": "Blank"}
-            if include_notes:
-                pad["notes"] = ""
-            out.append(pad)
+            out.append(_padding_slide(len(out) + 1, include_notes))
         return out
 
     cleaned = _ensure_min_slides(cleaned)[:MAX_SLIDES]
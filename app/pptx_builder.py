@@ -14,19 +14,21 @@ This module is defensive against unusual templates and missing placeholders.
 
 from __future__ import annotations
 
+from collections import Counter
+from functools import lru_cache
 from io import BytesIO
-from typing import List, Optional, Tuple, Dict
+from typing import TYPE_CHECKING, List, Optional, Tuple, Dict
 
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.enum.shapes import PP_PLACEHOLDER, MSO_SHAPE_TYPE
-from pptx.dml.color import RGBColor
+if TYPE_CHECKING:  # python-pptx is imported lazily on the first build (see _load_pptx)
+    from pptx.dml.color import RGBColor
 
 from .schemas import Outline, OutlineSlide
 from .template_utils import (
-    extract_template_images,   # fallback media scraping
+    copy_template_presentation,  # mutable copy of a cached, pre-parsed template
     find_preferred_layout,     # name-based helper
-    get_theme_style,           # theme colors & fonts {"colors": {...}, "fonts": {...}}
+    parse_template,            # per-process cache of validated + parsed templates
+    template_media,            # extract_template_images memoized on the parse_template entry
+    template_theme,            # get_theme_style memoized on the parse_template entry
 )
 
 # ---------------- Tunables ----------------
@@ -36,53 +38,83 @@ BODY_FALLBACK_SIZE_PT = 18
 MAX_BULLETS_PER_SLIDE = 12
 EMU_PER_INCH = 914400
 
+# ---------------- Lazy python-pptx ----------------
+
+# Bound by _load_pptx(): lxml + python-pptx's class registrations cost ~90 ms, which
+# importing this module (health checks, outline previews) should not pay up front.
+Presentation = Inches = Pt = PP_PLACEHOLDER = MSO_SHAPE_TYPE = RGBColor = None
+_PH_CONTENT = None  # generic content placeholder (7): python-pptx 0.6.x only exposes it as OBJECT
+
+def _load_pptx() -> None:
+    global Presentation, Inches, Pt, PP_PLACEHOLDER, MSO_SHAPE_TYPE, RGBColor, _PH_CONTENT
+    if Presentation is not None:
+        return
+    from pptx import Presentation as _Presentation
+    from pptx.util import Inches, Pt
+    from pptx.enum.shapes import PP_PLACEHOLDER, MSO_SHAPE_TYPE
+    from pptx.dml.color import RGBColor
+    _PH_CONTENT = getattr(PP_PLACEHOLDER, "CONTENT", PP_PLACEHOLDER.OBJECT)
+    Presentation = _Presentation  # bound last: doubles as the "loaded" flag for other threads
+
 # Recognize sub-bullets (the parser uses a simple "  • " prefix for nesting).
 SUB_BULLET_PREFIX = "  • "
+_SUB_LEN = len(SUB_BULLET_PREFIX)
 
 # ---------------- Low-level helpers ----------------
 
+# Control chars except \t \n map to None: str.translate drops them in one C-level pass
+_CTRL_TABLE = dict.fromkeys((i for i in range(32) if i not in (9, 10)), None)
+
 def _strip_control_chars(s: str) -> str:
     # Remove control chars except \t \n
-    return "".join(ch for ch in (s or "") if ch == "\t" or ch == "\n" or ord(ch) >= 32)
+    return (s or "").translate(_CTRL_TABLE)
 
+@lru_cache(maxsize=32)
 def _rgb_from_hex(hex6: Optional[str]) -> Optional[RGBColor]:
+    # A theme has ~10 colors reused on every slide; RGBColor is an immutable tuple, safe to share
     if not hex6 or len(hex6) < 6:
         return None
     try:
-        r = int(hex6[0:2], 16)
-        g = int(hex6[2:4], 16)
-        b = int(hex6[4:6], 16)
+        r, g, b = bytes.fromhex(hex6[:6])
         return RGBColor(r, g, b)
     except Exception:
         return None
 
+def _style_runs(runs, *, name: Optional[str], size_pt: Optional[int], color: Optional[RGBColor]):
+    # Write a:rPr directly through the oxml layer: same elements the Font/ColorFormat
+    # proxies produce, without building those proxy objects for every run
+    sz = Pt(size_pt).centipoints if size_pt else None
+    rgb = str(color) if color else None
+    for r in runs:
+        rPr = r._r.get_or_add_rPr()
+        if name:
+            rPr.get_or_add_latin().typeface = name
+        if sz:
+            rPr.sz = sz
+        if rgb:
+            rPr.get_or_change_to_solidFill().get_or_change_to_srgbClr().val = rgb
+
 def _apply_font_to_runs(text_frame, *, name: Optional[str], size_pt: Optional[int], color: Optional[RGBColor]):
     # Apply font to all runs across all paragraphs in a text_frame.
     for p in text_frame.paragraphs:
-        for r in p.runs:
-            if name:
-                r.font.name = name
-            if size_pt:
-                r.font.size = Pt(size_pt)
-            if color:
-                r.font.color.rgb = color
+        _style_runs(p.runs, name=name, size_pt=size_pt, color=color)
 
 def _bullet_level_and_text(text: str) -> Tuple[int, str]:
     """
     Detect whether this bullet should be level-0 or level-1.
     The parser formats sub-bullets with a '  • ' prefix; detect this and set level=1.
     """
-    s = _strip_control_chars(text or "").rstrip()
+    s = _strip_control_chars(text).rstrip()
     if not s:
         return 0, ""
     if s.startswith(SUB_BULLET_PREFIX):
-        return 1, s[len(SUB_BULLET_PREFIX):].strip()
-    # Also tolerate literal "•"
-    if s.strip().startswith("•") and not s.startswith("•"):  # e.g., "   • text"
-        cleaned = s[s.index("•") + 1:].strip()
-        return 1, cleaned
-    if s.startswith("• "):
-        return 1, s[2:].strip()
+        return 1, s[_SUB_LEN:].strip()
+    if s[0] == "•":
+        return (1, s[2:].strip()) if s[1:2] == " " else (0, s)
+    # Also tolerate indented literal "•", e.g. "   • text"
+    body = s.lstrip()
+    if body[0] == "•" and len(body) != len(s):
+        return 1, body[1:].strip()
     return 0, s
 
 # ---------------- Placeholder finders ----------------
@@ -111,66 +143,82 @@ def _content_placeholders(slide):
     for shp in slide.placeholders:
         try:
             ptype = shp.placeholder_format.type
-            if ptype in (PP_PLACEHOLDER.BODY, PP_PLACEHOLDER.CONTENT, PP_PLACEHOLDER.SUBTITLE):
+            if ptype in (PP_PLACEHOLDER.BODY, _PH_CONTENT, PP_PLACEHOLDER.SUBTITLE):
                 _ = shp.text_frame  # ensure text-capable
                 out.append(shp)
         except Exception:
             continue
     return out
 
-def _picture_placeholders(slide):
-    holders = []
-    for shp in slide.placeholders:
+def _classify_slide(slide, layout=None, geom: Optional[Dict[tuple, Dict[str, int]]] = None) -> Dict[str, object]:
+    """
+    One walk over slide.shapes classifying placeholders by role and collecting text-zone rects
+    (title/body/center-title/subtitle/content placeholders, plus any shape with a text_frame):
+    {"title": title ph or None (no fallback), "content": [...], "pictures": [...], "zones": [...]}.
+    Pass the slide's layout and a per-build geom dict to memoize inherited placeholder rects.
+    """
+    title = None
+    content, pictures, zones = [], [], []
+    for sh in slide.shapes:
         try:
-            if shp.placeholder_format.type in (PP_PLACEHOLDER.PICTURE, PP_PLACEHOLDER.CONTENT):
-                holders.append(shp)
+            is_ph = bool(getattr(sh, "is_placeholder", False))
+            ptype = sh.placeholder_format.type if is_ph else None
         except Exception:
             continue
-    return holders
+        if is_ph:
+            if title is None and ptype in (PP_PLACEHOLDER.TITLE, PP_PLACEHOLDER.CENTER_TITLE):
+                title = sh
+            if ptype in (PP_PLACEHOLDER.BODY, _PH_CONTENT, PP_PLACEHOLDER.SUBTITLE):
+                try:
+                    _ = sh.text_frame  # ensure text-capable
+                    content.append(sh)
+                except Exception:
+                    pass
+            # Only real picture placeholders: OBJECT (content) ones have no insert_picture()
+            if ptype == PP_PLACEHOLDER.PICTURE and hasattr(sh, "insert_picture"):
+                pictures.append(sh)
+        try:
+            if (is_ph and ptype in (1, 2, 3, 4, 7)) or getattr(sh, "has_text_frame", False):
+                zones.append(_shape_rect(sh, layout, geom))
+        except Exception:
+            pass
+    return {"title": title, "content": content, "pictures": pictures, "zones": zones}
 
-def _first_picture_placeholder(slide):
-    pics = _picture_placeholders(slide)
-    return pics[0] if pics else None
+def _shape_rect(sh, layout=None, geom: Optional[Dict[tuple, Dict[str, int]]] = None) -> Dict[str, int]:
+    """
+    Rect for a shape. A slide placeholder without its own a:xfrm inherits all four values
+    from the layout placeholder with the same idx (an XPath lookup per attribute in python-pptx),
+    so those rects are memoized per (layout, idx) in geom. Rects are shared: treat as read-only.
+    """
+    if geom is not None and layout is not None and getattr(sh, "is_placeholder", False):
+        el = sh._element
+        if el.xfrm is None:
+            key = (id(layout), el.ph_idx)  # SlideLayout is unhashable; it outlives the build-scoped geom
+            r = geom.get(key)
+            if r is None:
+                r = geom[key] = _rect(int(sh.left), int(sh.top), int(sh.width), int(sh.height))
+            return r
+    return _rect(int(sh.left), int(sh.top), int(sh.width), int(sh.height))
 
 # ---------------- Geometry & safe-zone helpers ----------------
 
 def _rect(left: int, top: int, width: int, height: int) -> Dict[str, int]:
     return {"left": max(0, left), "top": max(0, top), "width": max(0, width), "height": max(0, height)}
 
-def _collect_text_zones(slide) -> List[Dict[str, int]]:
-    """
-    Rects for any shape likely to hold text: title/body/center-title/subtitle/content placeholders,
-    plus any autoshape/textbox with a text_frame.
-    """
-    zones: List[Dict[str, int]] = []
-    for sh in slide.shapes:
-        try:
-            if getattr(sh, "is_placeholder", False):
-                ph_type = getattr(getattr(sh, "placeholder_format", None), "type", None)
-                # common text placeholders: 1=TITLE, 2=BODY, 3=CENTER_TITLE, 4=SUBTITLE, 7=CONTENT
-                if ph_type in (1, 2, 3, 4, 7):
-                    zones.append(_rect(int(sh.left), int(sh.top), int(sh.width), int(sh.height)))
-                    continue
-            if getattr(sh, "has_text_frame", False):
-                zones.append(_rect(int(sh.left), int(sh.top), int(sh.width), int(sh.height)))
-        except Exception:
-            continue
-    return zones
-
-def _intersect_area(a: Dict[str, int], b: Dict[str, int]) -> int:
-    if not a or not b:
-        return 0
-    ax1, ay1, ax2, ay2 = a["left"], a["top"], a["left"] + a["width"], a["top"] + a["height"]
-    bx1, by1, bx2, by2 = b["left"], b["top"], b["left"] + b["width"], b["top"] + b["height"]
-    ix1, iy1, ix2, iy2 = max(ax1, bx1), max(ay1, by1), min(ax2, bx2), min(ay2, by2)
-    if ix2 <= ix1 or iy2 <= iy1:
-        return 0
-    return (ix2 - ix1) * (iy2 - iy1)
-
 def _overlaps_any_text(img: Dict[str, int], zones: List[Dict[str, int]], thresh: float = 0.10) -> bool:
-    area = max(1, img["width"] * img["height"])
+    # Intersection inlined against one precomputed bound: no call frame or division per zone
+    ax1, ay1 = img["left"], img["top"]
+    ax2, ay2 = ax1 + img["width"], ay1 + img["height"]
+    limit = thresh * max(1, img["width"] * img["height"])
     for z in zones:
-        if _intersect_area(img, z) / area > thresh:
+        if not z:
+            continue
+        zx1, zy1 = z["left"], z["top"]
+        iw = min(ax2, zx1 + z["width"]) - max(ax1, zx1)
+        if iw <= 0:
+            continue
+        ih = min(ay2, zy1 + z["height"]) - max(ay1, zy1)
+        if ih > 0 and iw * ih > limit:
             return True
     return False
 
@@ -253,29 +301,37 @@ def _clear_all_slides_safely(prs: Presentation) -> None:
     Delete all slides and drop relationships to prevent 'repair' prompts in Office.
     """
     sldIdLst = prs.slides._sldIdLst
-    for sldId in list(sldIdLst):
+    sldIds = list(sldIdLst)
+    if not sldIds:
+        return
+    part = prs.part
+    # Count every r:id reference in one XPath pass; part.drop_rel re-runs it per slide (O(N^2))
+    refs = Counter(part._element.xpath("//@r:id"))
+    for sldId in sldIds:
         rId = sldId.rId
-        prs.part.drop_rel(rId)
+        if refs[rId] < 2:  # same rule as drop_rel: only the sldId itself references it
+            part.rels.pop(rId)
         sldIdLst.remove(sldId)
 
+def _layout_ph_types(layout) -> set:
+    """
+    ST_PlaceholderType strings of a layout's placeholders, read with one XPath over the
+    same elements layout.placeholders walks. A p:ph without @type is "obj" (content).
+    """
+    return {ph.get("type", "obj") for ph in layout._element.xpath("./p:cSld/p:spTree/*/*[1]/p:nvPr/p:ph")}
+
 def _find_title_and_content_layout_index(prs: Presentation) -> Optional[int]:
     """
     Heuristic: find a layout that has both a title and a body/content placeholder.
     This is sturdier than name matching on non-English or custom templates.
     """
     for i, layout in enumerate(prs.slide_layouts):
-        has_title, has_body = False, False
         try:
-            for ph in layout.placeholders:
-                t = ph.placeholder_format.type
-                if t == PP_PLACEHOLDER.TITLE:        # 1
-                    has_title = True
-                if t in (PP_PLACEHOLDER.BODY, PP_PLACEHOLDER.CONTENT):  # 2 or 7
-                    has_body = True
-            if has_title and has_body:
-                return i
+            types = _layout_ph_types(layout)
         except Exception:
             continue
+        if "title" in types and not types.isdisjoint(("body", "obj")):  # TITLE + BODY/CONTENT
+            return i
     return None
 
 def _find_title_layout_index(prs: Presentation) -> Optional[int]:
@@ -292,17 +348,17 @@ def _find_title_layout_index(prs: Presentation) -> Optional[int]:
     # Then capability search: any layout with a title placeholder
     for i, layout in enumerate(prs.slide_layouts):
         try:
-            for ph in layout.placeholders:
-                if ph.placeholder_format.type in (PP_PLACEHOLDER.TITLE, PP_PLACEHOLDER.CENTER_TITLE):
-                    return i
+            if not _layout_ph_types(layout).isdisjoint(("title", "ctrTitle")):
+                return i
         except Exception:
             continue
     return 0 if prs.slide_layouts else None
 
 # ---------------- Writers ----------------
 
-def _set_title(slide, title_text: str, theme: Optional[dict]):
-    ph = _title_placeholder(slide)
+def _set_title(slide, title_text: str, theme: Optional[dict], ph=None):
+    if ph is None:
+        ph = _title_placeholder(slide)
     if ph is None:
         return
     ph.text = _strip_control_chars(title_text or "")
@@ -338,11 +394,17 @@ def _set_bullets_single(tf, bullets: List[str], theme: Optional[dict]):
 
     bullets = list(bullets)[:MAX_BULLETS_PER_SLIDE]
 
+    # Theme font, applied to each paragraph's runs as it is written (no second walk)
+    body_font = (theme or {}).get("fonts", {}).get("minor") or (theme or {}).get("fonts", {}).get("major")
+    body_color_hex = (theme or {}).get("colors", {}).get("dk1")
+    body_color = _rgb_from_hex(body_color_hex)
+
     # First bullet
     lvl, txt = _bullet_level_and_text(bullets[0])
     p0 = tf.paragraphs[0]
     p0.level = max(0, min(4, lvl))
     p0.text = txt
+    _style_runs(p0.runs, name=body_font, size_pt=BODY_FALLBACK_SIZE_PT, color=body_color)
 
     # Others
     for b in bullets[1:]:
@@ -352,20 +414,17 @@ def _set_bullets_single(tf, bullets: List[str], theme: Optional[dict]):
         para = tf.add_paragraph()
         para.level = max(0, min(4, lvl))
         para.text = txt
+        _style_runs(para.runs, name=body_font, size_pt=BODY_FALLBACK_SIZE_PT, color=body_color)
 
-    # Apply theme
-    body_font = (theme or {}).get("fonts", {}).get("minor") or (theme or {}).get("fonts", {}).get("major")
-    body_color_hex = (theme or {}).get("colors", {}).get("dk1")
-    body_color = _rgb_from_hex(body_color_hex)
-    _apply_font_to_runs(tf, name=body_font, size_pt=BODY_FALLBACK_SIZE_PT, color=body_color)
-
-def _set_bullets(slide, bullets: List[str], theme: Optional[dict]):
+def _set_bullets(slide, bullets: List[str], theme: Optional[dict], placeholders=None):
     """
     Fill bullets into available content placeholders.
     - If two or more content placeholders exist and there are many bullets, split across first two.
     - Otherwise, write into the first content placeholder.
+    Pass placeholders (from _classify_slide) to skip the rescan.
     """
-    placeholders = _content_placeholders(slide)
+    if placeholders is None:
+        placeholders = _content_placeholders(slide)
     if not placeholders:
         return
 
@@ -390,6 +449,7 @@ def build_presentation(
     *,
     subtitle: Optional[str] = None,
     reuse_images: bool = False,
+    parsed_template: Optional[Dict[str, object]] = None,
 ) -> bytes:
     """
     Build a .pptx as bytes from the given outline and template (.pptx/.potx bytes).
@@ -401,9 +461,12 @@ def build_presentation(
     - Applies theme fonts/colors for titles and bullets.
     - Supports two-column bullets when layout provides two content placeholders.
     - Writes speaker notes if present.
+
+    Pass parsed_template (from template_utils.parse_template) to skip re-parsing the template.
     """
-    prs = Presentation(BytesIO(template_bytes))
-    theme = get_theme_style(template_bytes) or {"colors": {}, "fonts": {}}
+    _load_pptx()
+    prs = copy_template_presentation(parsed_template) or Presentation(BytesIO(template_bytes))
+    theme = template_theme(parsed_template, template_bytes) or {"colors": {}, "fonts": {}}
 
     # --- Harvest images per slide (exact reuse) BEFORE clearing slides
     template_pictures: List[List[Dict[str, int]]] = []
@@ -438,6 +501,11 @@ def build_presentation(
 
     slide_w, slide_h = int(prs.slide_width), int(prs.slide_height)
 
+    # Layouts never change while slides are added: resolve each requested name once per deck
+    resolved_layouts: Dict[str, object] = {}
+    deck_media: Optional[List[bytes]] = None  # fetched lazily, at most once per deck
+    geom: Dict[tuple, Dict[str, int]] = {}  # inherited placeholder rects per (layout, idx)
+
     # ----- Content slides -----
     for idx, s in enumerate(outline.slides):
         requested = (s.layout or "auto").strip().lower()
@@ -445,10 +513,12 @@ def build_presentation(
         # Select layout: try requested name; else use capability-based default.
         chosen_layout = None
         if requested != "auto":
-            chosen_layout = find_preferred_layout(
-                prs,
-                [s.layout, "Title and Content", "Two Content", "Content with Caption", "Picture with Caption", "Blank"],
-            )
+            if s.layout not in resolved_layouts:
+                resolved_layouts[s.layout] = find_preferred_layout(
+                    prs,
+                    [s.layout, "Title and Content", "Two Content", "Content with Caption", "Picture with Caption", "Blank"],
+                )
+            chosen_layout = resolved_layouts[s.layout]
         if chosen_layout is None:
             chosen_layout = prs.slide_layouts[content_layout_idx]
 
@@ -457,14 +527,17 @@ def build_presentation(
         # Compute likely text zones (from placeholders) BEFORE placing images
         title_rect = None
         body_rect = None
-        if slide.shapes.title:
-            t = slide.shapes.title
-            title_rect = _rect(int(t.left), int(t.top), int(t.width), int(t.height))
-        for ph in _content_placeholders(slide):
-            body_rect = _rect(int(ph.left), int(ph.top), int(ph.width), int(ph.height))
+        t = slide.shapes.title  # one placeholder scan, not two
+        if t is not None:
+            title_rect = _shape_rect(t, chosen_layout, geom)
+        # Every placeholder role + text zone from one walk over the fresh slide
+        roles = _classify_slide(slide, chosen_layout, geom)
+        content_phs = roles["content"]
+        for ph in content_phs:
+            body_rect = _shape_rect(ph, chosen_layout, geom)
             break  # first content area is enough
 
-        text_zones = _collect_text_zones(slide)
+        text_zones = roles["zones"]
 
         # --- 1) Insert images FIRST so text stays on top; avoid overlapping text
         if reuse_images and template_pictures and idx < len(template_pictures):
@@ -489,13 +562,19 @@ def build_presentation(
         else:
             # Fallback: opportunistic media reuse from /ppt/media if layout suggests picture
             layout_name = (getattr(chosen_layout, "name", "") or "").lower()
-            wants_picture = "picture" in layout_name or _first_picture_placeholder(slide) is not None
-            media = extract_template_images(template_bytes) if wants_picture else []
+            pic_ph = roles["pictures"][0] if roles["pictures"] else None
+            wants_picture = "picture" in layout_name or pic_ph is not None
+            media: List[bytes] = []
+            if wants_picture:
+                if deck_media is None:
+                    deck_media = template_media(parsed_template, template_bytes)
+                media = deck_media
             if media:
                 # Place a single picture to add some visual continuity
                 try:
-                    ph = _first_picture_placeholder(slide)
+                    ph = pic_ph
                     if ph is not None:
+                        content_phs = None  # placeholder swapped for a picture: rescan text targets
                         ph.insert_picture(BytesIO(media[0]))
                     else:
                         # Right-side placement
@@ -507,8 +586,8 @@ def build_presentation(
                     pass
 
         # --- 2) Now add text so it stays above images
-        _set_title(slide, s.title, theme)
-        _set_bullets(slide, list(s.bullets or []), theme)
+        _set_title(slide, s.title, theme, roles["title"])
+        _set_bullets(slide, list(s.bullets or []), theme, content_phs)
 
         # Speaker notes (optional)
         if getattr(s, "notes", None) is not None:
@@ -524,3 +603,23 @@ def build_presentation(
     bio = BytesIO()
     prs.save(bio)
     return bio.getvalue()
+
+
+def build_presentation_job(
+    outline: Outline,
+    template_bytes: bytes,
+    subtitle: Optional[str] = None,
+    reuse_images: bool = False,
+) -> bytes:
+    """
+    Picklable entry point for process-pool workers: the outline arrives as an
+    already-validated model, the template is parsed (and cached) inside the worker.
+    """
+    parsed = parse_template(template_bytes)
+    return build_presentation(
+        outline,
+        template_bytes,
+        subtitle=subtitle,
+        reuse_images=reuse_images,
+        parsed_template=parsed if parsed.get("safe") else None,
+    )
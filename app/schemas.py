@@ -38,6 +38,7 @@ _CANONICAL_LAYOUTS = [
     "Picture with Caption",
     "Blank",
 ]
+_CANONICAL_SET = frozenset(_CANONICAL_LAYOUTS)
 LayoutName = Literal[
     "auto",
     "Title and Content",
@@ -62,13 +63,18 @@ _LAYOUT_ALIASES = {
 # ---------------- helpers ----------------
 
 _WS_RE = re.compile(r"\s+")
-_CTRL_KEEP = {"\n", "\t"}
+# Control chars except \t \n map to None; str.translate drops them in C
+_CTRL_TABLE = dict.fromkeys((i for i in range(32) if i not in (9, 10)), None)
 
 def _strip_controls(s: str) -> str:
-    return "".join(ch for ch in (s or "") if (ch in _CTRL_KEEP) or (ord(ch) >= 32))
+    return (s or "").translate(_CTRL_TABLE)
 
 def _collapse_ws(s: str) -> str:
-    return _WS_RE.sub(" ", (s or "").strip())
+    s = s or ""
+    # Already-collapsed text skips the regex: isprintable() rules out every whitespace char but " "
+    if s.isprintable() and "  " not in s and s[:1] != " " and s[-1:] != " ":
+        return s
+    return _WS_RE.sub(" ", s.strip())
 
 def _clean_text(s: str, limit: int) -> str:
     s = _strip_controls(s)
@@ -76,13 +82,8 @@ def _clean_text(s: str, limit: int) -> str:
     return s if len(s) <= limit else s[: max(0, limit - 1)].rstrip() + "…"
 
 def _dedup_keep_order(items: List[str]) -> List[str]:
-    seen = set()
-    out: List[str] = []
-    for it in items:
-        if it not in seen:
-            seen.add(it)
-            out.append(it)
-    return out
+    # dicts keep insertion order: first occurrence wins, deduped in C
+    return list(dict.fromkeys(items))
 
 def _coerce_bullets(value) -> List[str]:
     # Accept list of strings primarily; if given a string, split by newlines.
@@ -108,6 +109,8 @@ def _coerce_bullets(value) -> List[str]:
 def _canonical_layout(name: str | None) -> LayoutName:
     if not name:
         return "auto"
+    if type(name) is str and name in _CANONICAL_SET:
+        return name  # already canonical ("auto" for most slides): no strip/lower copies
     key = str(name).strip().lower()
     return _LAYOUT_ALIASES.get(key, "auto")  # default to auto if unknown
 
@@ -123,37 +126,23 @@ class OutlineSlide(BaseModel):
 
     # --- validators ---
 
-    @field_validator("title", mode="before")
-    @classmethod
-    def _v_title(cls, v: str) -> str:
-        v = _clean_text(str(v or "").strip(), MAX_TITLE_CHARS)
-        return v or "Slide"
-
-    @field_validator("bullets", mode="before")
-    @classmethod
-    def _v_bullets_before(cls, v):
-        return _coerce_bullets(v)
-
-    @field_validator("bullets")
-    @classmethod
-    def _v_bullets_after(cls, v: List[str]) -> List[str]:
-        # Final trim + filter empties + cap
-        out = [_clean_text(b, MAX_BULLET_CHARS) for b in v if b and b.strip()]
-        out = _dedup_keep_order(out)
-        return out[:MAX_BULLETS_PER_SLIDE]
-
-    @field_validator("layout", mode="before")
-    @classmethod
-    def _v_layout(cls, v) -> LayoutName:
-        return _canonical_layout(v)
-
-    @field_validator("notes", mode="before")
+    @model_validator(mode="before")
     @classmethod
-    def _v_notes(cls, v: Optional[str]) -> Optional[str]:
-        if v is None:
-            return None
-        cleaned = _clean_text(str(v), MAX_NOTES_CHARS)
-        return cleaned if cleaned else None
+    def _m_clean(cls, data):
+        # One pass over the raw dict instead of a field_validator dispatch per field.
+        # Only keys that are present are touched, so defaults and "required" behave as before.
+        if not isinstance(data, dict):
+            return data
+        data = dict(data)
+        if "title" in data:
+            data["title"] = _clean_text(str(data["title"] or "").strip(), MAX_TITLE_CHARS) or "Slide"
+        if "bullets" in data:
+            data["bullets"] = _coerce_bullets(data["bullets"])  # clean + drop empties + dedup + cap
+        if "layout" in data:
+            data["layout"] = _canonical_layout(data["layout"])
+        if "notes" in data and data["notes"] is not None:
+            data["notes"] = _clean_text(str(data["notes"]), MAX_NOTES_CHARS) or None
+        return data
 
 
 class Outline(BaseModel):
@@ -7,29 +7,49 @@ Utilities for working with uploaded PowerPoint templates:
 - PPTX safety checks to avoid zip-bombs / corrupt files
 - Slide dimension helper (EMU, inches, cm)
 - Template analyzer for debugging (names, capabilities, theme, dimensions, image count)
+- Content-addressed cache of validated + parsed templates (repeat renders skip zip/XML parsing)
 """
 
 from __future__ import annotations
 
+import copy
+import difflib
 import hashlib
 import os
+import threading
+import weakref
 import zipfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
 from io import BytesIO
-from typing import Dict, List, Optional, Tuple
-import xml.etree.ElementTree as ET
-
-from pptx import Presentation
-from pptx.slide import SlideLayout
-from pptx.enum.shapes import PP_PLACEHOLDER
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple, Union
+
+if TYPE_CHECKING:  # python-pptx is imported lazily on first use (see _load_pptx)
+    from pptx.slide import SlideLayout
+
+try:  # optional SIMD hash for template cache keys; hashlib is the fallback
+    import blake3
+except ImportError:
+    blake3 = None
+
+try:  # lxml (installed with python-pptx) parses theme XML ~2x faster than ElementTree
+    from lxml import etree as ET
+    # Uploaded XML is untrusted: no entity expansion, no network fetches
+    _THEME_PARSER = ET.XMLParser(resolve_entities=False, no_network=True)
+except ImportError:
+    import xml.etree.ElementTree as ET
+    _THEME_PARSER = None
+
+# Image/zip limits, cache bounds and layout matching are parsed once in app.config
+from .config import (
+    LAYOUT_NAME_FUZZY_RATIO, MAX_TEMPLATE_IMAGES, MAX_TEMPLATE_IMAGE_MB, MAX_ZIP_ENTRIES, MAX_ZIP_MEMBER_MB,
+    TEMPLATE_CACHE_MB, TEMPLATE_CACHE_SIZE,
+)
 
 # ---------------- Limits / Env ----------------
 
-MAX_TEMPLATE_IMAGES = int(os.getenv("MAX_TEMPLATE_IMAGES", "20"))
-MAX_TEMPLATE_IMAGE_MB = int(os.getenv("MAX_TEMPLATE_IMAGE_MB", "5"))
-
 # Zip safety
-MAX_ZIP_ENTRIES = int(os.getenv("MAX_ZIP_ENTRIES", "2000"))
-MAX_ZIP_MEMBER_MB = int(os.getenv("MAX_ZIP_MEMBER_MB", "50"))
 MAX_ZIP_TOTAL_MB = int(os.getenv("MAX_ZIP_TOTAL_MB", "200"))
 MAX_COMPRESSION_RATIO = float(os.getenv("MAX_COMPRESSION_RATIO", "200.0"))
 
@@ -39,89 +59,233 @@ RASTER_EXTS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff"}
 EMU_PER_INCH = 914400
 CM_PER_INCH = 2.54
 
-# Build a tolerant placeholder-name map based on what's available in this python-pptx version
+# ---------------- Lazy python-pptx ----------------
+
+# Bound by _load_pptx() on the first parse/analysis, keeping python-pptx's import cost
+# off app start-up. The placeholder-name map is filled in at the same time.
+Presentation = PP_PLACEHOLDER = None
 _PLACEHOLDER_NAMES: Dict[int, str] = {}
-for _name in ("TITLE", "BODY", "CENTER_TITLE", "SUBTITLE", "DATE", "SLIDE_NUMBER", "FOOTER", "HEADER", "CONTENT", "PICTURE"):
-    _val = getattr(PP_PLACEHOLDER, _name, None)
-    if _val is not None:  # only include if present in this install
-        _PLACEHOLDER_NAMES[int(_val)] = _name
+_PICTURE_PH_TYPES: frozenset = frozenset()  # placeholder types that can hold a picture
+
+def _load_pptx() -> None:
+    global Presentation, PP_PLACEHOLDER, _PICTURE_PH_TYPES
+    if Presentation is not None:
+        return
+    from pptx import Presentation as _Presentation
+    from pptx.enum.shapes import PP_PLACEHOLDER
+    # Build a tolerant placeholder-name map based on what's available in this python-pptx version
+    for _name in ("TITLE", "BODY", "CENTER_TITLE", "SUBTITLE", "DATE", "SLIDE_NUMBER", "FOOTER", "HEADER", "CONTENT", "PICTURE"):
+        _val = getattr(PP_PLACEHOLDER, _name, None)
+        if _val is not None:  # only include if present in this install
+            _PLACEHOLDER_NAMES[int(_val)] = _name
+    # CONTENT only exists in newer python-pptx; absent members are simply left out
+    _PICTURE_PH_TYPES = frozenset(
+        int(v) for v in (getattr(PP_PLACEHOLDER, "PICTURE", None), getattr(PP_PLACEHOLDER, "CONTENT", None)) if v is not None
+    )
+    Presentation = _Presentation  # bound last: doubles as the "loaded" flag for other threads
+
+# ---------------- Zip access ----------------
+
+# Raw template bytes, or a ZipFile already opened over them (parse the central directory once)
+TemplateSource = Union[bytes, zipfile.ZipFile]
+
+def open_template_zip(template_bytes: bytes) -> zipfile.ZipFile:
+    return zipfile.ZipFile(BytesIO(template_bytes), "r")
+
+@contextmanager
+def _zip_view(src: TemplateSource) -> Iterator[zipfile.ZipFile]:
+    # Borrow a caller-owned ZipFile as-is; open (and close) one over raw bytes otherwise
+    if isinstance(src, zipfile.ZipFile):
+        yield src
+    else:
+        with open_template_zip(src) as z:
+            yield z
 
 # ---------------- Safety ----------------
 
 def is_safe_pptx(
-    template_bytes: bytes,
+    template_bytes: TemplateSource,
     max_entries: int = MAX_ZIP_ENTRIES,
     max_member_mb: int = MAX_ZIP_MEMBER_MB,
     max_total_mb: int = MAX_ZIP_TOTAL_MB,
     max_ratio: float = MAX_COMPRESSION_RATIO,
 ) -> bool:
-    from zipfile import ZipFile, BadZipFile
+    return _safe_pptx_size(template_bytes, max_entries, max_member_mb, max_total_mb, max_ratio) is not None
+
+def _safe_pptx_size(
+    template_bytes: TemplateSource,
+    max_entries: int = MAX_ZIP_ENTRIES,
+    max_member_mb: int = MAX_ZIP_MEMBER_MB,
+    max_total_mb: int = MAX_ZIP_TOTAL_MB,
+    max_ratio: float = MAX_COMPRESSION_RATIO,
+) -> Optional[int]:
+    """Total uncompressed size of a safe template, or None if any check fails."""
+    from zipfile import BadZipFile
 
     try:
-        with ZipFile(BytesIO(template_bytes)) as z:
-            names = z.namelist()
-            if "[Content_Types].xml" not in names:
-                return False
-            if not any(n.endswith("ppt/presentation.xml") for n in names):
-                return False
-            if len(names) > max_entries:
-                return False
+        with _zip_view(template_bytes) as z:
+            infos = z.infolist()
+            if len(infos) > max_entries:
+                return None
 
             per_limit = max_member_mb * 1024 * 1024
+            total_limit = max_total_mb * 1024 * 1024
             total_uncompressed = 0
-
-            for info in z.infolist():
+            has_content_types = has_presentation = False
+
+            # One pass: required parts + per-member limits, out at the first violation
+            for info in infos:
+                name = info.filename
+                if name == "[Content_Types].xml":
+                    has_content_types = True
+                elif name.endswith("ppt/presentation.xml"):
+                    has_presentation = True
                 if info.is_dir():
                     continue
-                if info.file_size > per_limit:
-                    return False
-                total_uncompressed += info.file_size
-                if info.compress_size > 0:
-                    ratio = float(info.file_size) / float(info.compress_size)
-                    if ratio > max_ratio:
-                        return False
-
-            if total_uncompressed > max_total_mb * 1024 * 1024:
-                return False
-
-        return True
+                size = info.file_size
+                if size > per_limit:
+                    return None
+                total_uncompressed += size
+                if total_uncompressed > total_limit:
+                    return None
+                # ratio > max_ratio without the float division (compress_size > 0 only)
+                if info.compress_size > 0 and size > max_ratio * info.compress_size:
+                    return None
+
+            if not (has_content_types and has_presentation):
+                return None
+
+        return total_uncompressed
     except BadZipFile:
-        return False
+        return None
     except Exception:
-        return False
+        return None
+
+# ---------------- Parsed-template cache ----------------
+
+_TEMPLATE_CACHE: "OrderedDict[bytes, Dict[str, object]]" = OrderedDict()
+_TEMPLATE_CACHE_BYTES = 0
+_TEMPLATE_CACHE_LOCK = threading.Lock()
+
+def template_digest(template_bytes: bytes) -> bytes:
+    # One-shot C hash over the whole buffer (no Python-level update loop)
+    if blake3 is not None:
+        return blake3.blake3(template_bytes).digest()
+    return hashlib.sha256(template_bytes).digest()
+
+def parse_template(template_bytes: bytes) -> Dict[str, object]:
+    """
+    Validate and parse a template once per unique content.
+    Returns {"digest": bytes, "safe": bool, "prs": Presentation | None, "size": int, "lock": RLock}
+    ("size" is the memory charged against TEMPLATE_CACHE_MB: uncompressed parts + memoized media;
+    "lock" guards the entry's shared Presentation, so only users of the same template serialize).
+    The cached Presentation is pristine; use copy_template_presentation() to get a mutable copy.
+    """
+    global _TEMPLATE_CACHE_BYTES
+    digest = template_digest(template_bytes)
+    with _TEMPLATE_CACHE_LOCK:
+        hit = _TEMPLATE_CACHE.get(digest)
+        if hit is not None:
+            _TEMPLATE_CACHE.move_to_end(digest)
+            return hit
+
+    unpacked = _safe_pptx_size(template_bytes)
+    safe = unpacked is not None
+    prs = None
+    if safe:
+        _load_pptx()
+        try:
+            prs = Presentation(BytesIO(template_bytes))
+        except Exception:
+            prs = None  # builder will surface the failure when it re-opens the bytes
+    # Charge what the entry holds in memory: a parsed Presentation keeps every part
+    # (XML trees + media blobs), so the uncompressed size is the floor, not len(template_bytes).
+    size = unpacked if prs is not None else 0
+    entry: Dict[str, object] = {"digest": digest, "safe": safe, "prs": prs, "size": size, "lock": threading.RLock()}
+
+    limit = TEMPLATE_CACHE_MB * 1024 * 1024
+    if TEMPLATE_CACHE_SIZE <= 0 or size > limit:
+        return entry
+    with _TEMPLATE_CACHE_LOCK:
+        if digest not in _TEMPLATE_CACHE:
+            _TEMPLATE_CACHE[digest] = entry
+            _TEMPLATE_CACHE_BYTES += size
+        _evict_templates_locked()
+    return entry
+
+def _evict_templates_locked() -> None:
+    # Caller holds _TEMPLATE_CACHE_LOCK; drop LRU entries until both bounds hold
+    global _TEMPLATE_CACHE_BYTES
+    limit = TEMPLATE_CACHE_MB * 1024 * 1024
+    while _TEMPLATE_CACHE and (len(_TEMPLATE_CACHE) > TEMPLATE_CACHE_SIZE or _TEMPLATE_CACHE_BYTES > limit):
+        _, old = _TEMPLATE_CACHE.popitem(last=False)
+        _TEMPLATE_CACHE_BYTES -= int(old["size"])
+
+def _charge_template_entry(parsed: Dict[str, object], extra: int) -> None:
+    """Count bytes memoized on a cached entry against TEMPLATE_CACHE_MB."""
+    global _TEMPLATE_CACHE_BYTES
+    with _TEMPLATE_CACHE_LOCK:
+        if _TEMPLATE_CACHE.get(parsed["digest"]) is not parsed:
+            return  # uncached (or already evicted): dies with the request
+        parsed["size"] = int(parsed["size"]) + extra
+        _TEMPLATE_CACHE_BYTES += extra
+        _evict_templates_locked()
+
+def copy_template_presentation(parsed: Optional[Dict[str, object]]) -> Optional[Presentation]:
+    """Deep-copy the cached Presentation (python-pptx mutates in place)."""
+    if not parsed or parsed.get("prs") is None:
+        return None
+    with parsed["lock"]:  # keep concurrent copies off the shared lxml tree (this entry only)
+        return copy.deepcopy(parsed["prs"])
 
 # ---------------- Images ----------------
 
-def extract_template_images(template_bytes: bytes) -> List[bytes]:
+def extract_template_images(template_bytes: TemplateSource) -> List[bytes]:
     images: List[bytes] = []
-    seen_hashes = set()
+    # Exact dedup bucketed by size: unique sizes are never hashed or compared, and
+    # same-size candidates are compared with bytes == (a memcmp), not a digest.
+    seen_by_size: Dict[int, List[bytes]] = {}
     per_image_limit = MAX_TEMPLATE_IMAGE_MB * 1024 * 1024
 
-    with zipfile.ZipFile(BytesIO(template_bytes)) as z:
-        for name in sorted(z.namelist()):
-            if not name.startswith("ppt/media/"):
-                continue
-            ext = os.path.splitext(name)[1].lower()
-            if ext not in RASTER_EXTS:
+    with _zip_view(template_bytes) as z:
+        # Filter first, then sort only the (few) raster media names for a stable order
+        media_names = sorted(
+            n for n in z.namelist()
+            if n.startswith("ppt/media/") and os.path.splitext(n)[1].lower() in RASTER_EXTS
+        )
+        for name in media_names:
+            # Declared size from the central directory: oversized members are never inflated
+            if z.getinfo(name).file_size > per_image_limit:
                 continue
             with z.open(name) as f:
-                data = f.read()
+                data = f.read(per_image_limit + 1)  # bounded even if the header under-reports
                 if len(data) > per_image_limit:
                     continue
-                h = hashlib.sha256(data).hexdigest()
-                if h in seen_hashes:
+                same_size = seen_by_size.setdefault(len(data), [])
+                if data in same_size:
                     continue
+                same_size.append(data)
                 images.append(data)
-                seen_hashes.add(h)
                 if len(images) >= MAX_TEMPLATE_IMAGES:
                     break
     return images
 
 # ---------------- Theme parsing ----------------
 
-def get_theme_style(template_bytes: bytes) -> Dict[str, Dict[str, str]]:
+_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_A_CLR_SCHEME = _A + "clrScheme"
+_A_FONT_SCHEME = _A + "fontScheme"
+_A_SRGB_CLR = _A + "srgbClr"
+_A_LATIN = _A + "latin"
+# Clark-notation tag -> theme key, in the order colors are reported
+_THEME_COLOR_TAGS: Dict[str, str] = {
+    _A + t: t for t in ("dk1", "lt1", "dk2", "lt2", "accent1", "accent2", "accent3", "accent4", "accent5", "accent6")
+}
+_THEME_FONT_TAGS: Dict[str, str] = {_A + "majorFont": "major", _A + "minorFont": "minor"}
+
+def get_theme_style(template_bytes: TemplateSource) -> Dict[str, Dict[str, str]]:
     try:
-        with zipfile.ZipFile(BytesIO(template_bytes)) as z:
+        with _zip_view(template_bytes) as z:
             theme_name = next((n for n in z.namelist() if n.startswith("ppt/theme/theme")), None)
             if not theme_name:
                 return {"colors": {}, "fonts": {}}
@@ -130,33 +294,90 @@ def get_theme_style(template_bytes: bytes) -> Dict[str, Dict[str, str]]:
         return {"colors": {}, "fonts": {}}
 
     try:
-        root = ET.fromstring(xml_bytes)
-        ns = {"a": "http://schemas.openxmlformats.org/drawingml/2006/main"}
+        root = ET.fromstring(xml_bytes, _THEME_PARSER)
 
+        # One descent per scheme element; the first match of each tag wins, as with
+        # root.find(".//a:clrScheme/a:<tag>") in document order.
+        color_nodes: Dict[str, object] = {}
+        for scheme in root.iter(_A_CLR_SCHEME):
+            if scheme is root:  # ".//" only matches descendants
+                continue
+            for node in scheme:
+                tag = _THEME_COLOR_TAGS.get(node.tag)
+                if tag is not None and tag not in color_nodes:
+                    color_nodes[tag] = node
         colors: Dict[str, str] = {}
-        for tag in ["dk1", "lt1", "dk2", "lt2", "accent1", "accent2", "accent3", "accent4", "accent5", "accent6"]:
-            node = root.find(f".//a:clrScheme/a:{tag}", ns)
+        for tag in _THEME_COLOR_TAGS.values():  # fixed key order (dk1, lt1, ..., accent6)
+            node = color_nodes.get(tag)
             if node is None:
                 continue
-            srgb = node.find(".//a:srgbClr", ns)
+            srgb = next(node.iter(_A_SRGB_CLR), None)  # first descendant, no path parsing
             if srgb is not None and "val" in srgb.attrib:
                 colors[tag] = srgb.attrib["val"]
 
+        latin: Dict[str, object] = {}
+        for scheme in root.iter(_A_FONT_SCHEME):
+            if scheme is root:
+                continue
+            for font in scheme:
+                key = _THEME_FONT_TAGS.get(font.tag)
+                if key is not None and key not in latin:
+                    node = font.find(_A_LATIN)
+                    if node is not None:
+                        latin[key] = node
         fonts: Dict[str, str] = {}
-        major = root.find(".//a:fontScheme/a:majorFont/a:latin", ns)
-        minor = root.find(".//a:fontScheme/a:minorFont/a:latin", ns)
-        if major is not None and "typeface" in major.attrib:
-            fonts["major"] = major.attrib["typeface"]
-        if minor is not None and "typeface" in minor.attrib:
-            fonts["minor"] = minor.attrib["typeface"]
+        for key in ("major", "minor"):
+            node = latin.get(key)
+            if node is not None and "typeface" in node.attrib:
+                fonts[key] = node.attrib["typeface"]
 
         return {"colors": colors, "fonts": fonts}
     except Exception:
         return {"colors": {}, "fonts": {}}
 
+def template_theme(parsed: Optional[Dict[str, object]], template_bytes: TemplateSource) -> Dict[str, Dict[str, str]]:
+    """get_theme_style, memoized on the parse_template entry (read-only once stored)."""
+    if not parsed:
+        return get_theme_style(template_bytes)
+    theme = parsed.get("theme")
+    if theme is None:
+        with parsed["lock"]:  # concurrent first builds: one extraction, one stored memo
+            theme = parsed.get("theme")
+            if theme is None:
+                theme = parsed["theme"] = get_theme_style(template_bytes)
+    return theme
+
+def template_media(parsed: Optional[Dict[str, object]], template_bytes: TemplateSource) -> List[bytes]:
+    """extract_template_images, memoized on the parse_template entry (bytes count toward the cache bound)."""
+    if not parsed:
+        return extract_template_images(template_bytes)
+    media = parsed.get("media")
+    if media is None:
+        with parsed["lock"]:  # check-and-set: the bytes must be charged exactly once
+            media = parsed.get("media")
+            if media is None:
+                media = extract_template_images(template_bytes)
+                _charge_template_entry(parsed, sum(map(len, media)))
+                parsed["media"] = media
+    return media
+
 # ---------------- Layout selection ----------------
 
+# (text_capable, picture_capable) per layout, keyed weakly by its part: SlideLayout proxies
+# are unhashable, and entries drop out with the Presentation (or deep copy) they belong to.
+_LAYOUT_CAPS: "weakref.WeakKeyDictionary[object, Tuple[int, int]]" = weakref.WeakKeyDictionary()
+
 def _layout_capabilities(layout: SlideLayout) -> Tuple[int, int]:
+    try:
+        part = layout.part
+        caps = _LAYOUT_CAPS.get(part)
+    except Exception:
+        return _scan_layout_capabilities(layout)
+    if caps is None:
+        caps = _LAYOUT_CAPS[part] = _scan_layout_capabilities(layout)
+    return caps
+
+def _scan_layout_capabilities(layout: SlideLayout) -> Tuple[int, int]:
     text_capable = 0
     picture_capable = 0
     try:
@@ -165,30 +386,40 @@ def _layout_capabilities(layout: SlideLayout) -> Tuple[int, int]:
                 ptype = shp.placeholder_format.type
             except Exception:
                 continue
-            try:
-                _ = shp.text_frame
+            # has_text_frame answers without get_or_add_txBody() (text_frame adds one to the layout)
+            if getattr(shp, "has_text_frame", False):
                 text_capable += 1
-            except Exception:
-                pass
-            if ptype in (getattr(PP_PLACEHOLDER, "PICTURE", -1), getattr(PP_PLACEHOLDER, "CONTENT", -1)):
+            if ptype in _PICTURE_PH_TYPES:
                 picture_capable += 1
     except Exception:
         pass
     return text_capable, picture_capable
 
-def _name_match_score(candidate: str, target: str) -> int:
-    c = (candidate or "").strip().lower()
-    t = (target or "").strip().lower()
+def _name_match_score(c: str, t: str) -> int:
+    # c/t arrive stripped + lowercased (normalized once per call of find_preferred_layout)
     if not c or not t:
         return 0
     if c == t:
         return 3
     if t in c:
         return 2
+    if _fuzzy_name_match(c, t):
+        return 1  # below exact/contains: only decides when nothing matched before
     return 0
 
-def _capability_ok(target: str, text_count: int, pic_count: int) -> bool:
-    t = (target or "").lower()
+@lru_cache(maxsize=1024)
+def _fuzzy_name_match(c: str, t: str) -> bool:
+    # "title + content" ~ "title and content" at >= LAYOUT_NAME_FUZZY_RATIO (app.config);
+    # the quick_* upper bounds reject most pairs cheaply
+    sm = difflib.SequenceMatcher(None, c, t, autojunk=False)
+    return (
+        sm.real_quick_ratio() >= LAYOUT_NAME_FUZZY_RATIO
+        and sm.quick_ratio() >= LAYOUT_NAME_FUZZY_RATIO
+        and sm.ratio() >= LAYOUT_NAME_FUZZY_RATIO
+    )
+
+def _capability_ok(t: str, text_count: int, pic_count: int) -> bool:
+    # t is the lowercased target name
     if "two content" in t:
         return text_count >= 2
     if "picture" in t:
@@ -200,26 +431,34 @@ def _capability_ok(target: str, text_count: int, pic_count: int) -> bool:
 def find_preferred_layout(prs: Presentation, preferred_names: List[str]) -> Optional[SlideLayout]:
     if not preferred_names:
         return None
+    _load_pptx()  # _layout_capabilities reads _PICTURE_PH_TYPES
 
-    lowered = [p.lower() for p in preferred_names]
-    for layout in prs.slide_layouts:
+    # Normalize the preference names once; first occurrence wins on exact-name hits
+    lowered: Dict[str, int] = {}
+    for i, p in enumerate(preferred_names):
+        lowered.setdefault(p.lower(), i)
+    prefs = [(p or "").strip().lower() for p in preferred_names]
+
+    layouts = list(prs.slide_layouts)
+    for layout in layouts:
         try:
-            if layout.name and layout.name.lower() in lowered:
+            name = layout.name
+            i = lowered.get(name.lower()) if name else None
+            if i is not None:
                 txt, pic = _layout_capabilities(layout)
-                target = preferred_names[lowered.index(layout.name.lower())]
-                if _capability_ok(target, txt, pic):
+                if _capability_ok(prefs[i], txt, pic):
                     return layout
         except Exception:
             continue
 
     best: Tuple[int, Optional[SlideLayout]] = (0, None)
-    for layout in prs.slide_layouts:
-        lname = getattr(layout, "name", "") or ""
+    for layout in layouts:
+        lname = (getattr(layout, "name", "") or "").strip().lower()
         txt, pic = _layout_capabilities(layout)
         score = 0
-        for pref in preferred_names:
-            score = max(score, _name_match_score(lname, pref))
-            if score > 0 and not _capability_ok(pref, txt, pic):
+        for t in prefs:
+            score = max(score, _name_match_score(lname, t))
+            if score > 0 and not _capability_ok(t, txt, pic):
                 score = 0
         if score > best[0]:
             best = (score, layout)
@@ -253,18 +492,12 @@ def _placeholder_summary(layout: SlideLayout) -> Dict[str, int | List[str]]:
     try:
         for shp in layout.placeholders:
             try:
-                ptype = shp.placeholder_format.type
-                friendly = _PLACEHOLDER_NAMES.get(int(ptype), f"#{int(ptype)}")
-                names.append(friendly)
-                try:
-                    _ = shp.text_frame
+                pt = int(shp.placeholder_format.type)
+                # "#<n>" is only formatted for types this python-pptx has no name for
+                names.append(_PLACEHOLDER_NAMES.get(pt) or f"#{pt}")
+                if getattr(shp, "has_text_frame", False):
                     text_capable += 1
-                except Exception:
-                    pass
-                if int(ptype) in (
-                    int(getattr(PP_PLACEHOLDER, "PICTURE", -1)),
-                    int(getattr(PP_PLACEHOLDER, "CONTENT", -1)),
-                ):
+                if pt in _PICTURE_PH_TYPES:
                     picture_capable += 1
             except Exception:
                 continue
@@ -277,12 +510,76 @@ def _placeholder_summary(layout: SlideLayout) -> Dict[str, int | List[str]]:
         "types": names,
     }
 
-def analyze_template(template_bytes: bytes) -> Dict[str, object]:
+def analyze_template(template_bytes: bytes, *, include_placeholders: bool = True) -> Dict[str, object]:
+    """
+    Template summary; safe templates share the parse_template entry (and its cached info).
+    include_placeholders=False leaves out the per-layout "placeholders" block (index + name only)
+    and skips the placeholder walk unless the full analysis is already cached.
+    """
+    parsed = parse_template(template_bytes)
+    if parsed["safe"]:
+        if include_placeholders:
+            return _template_info(parsed, template_bytes)
+        return _template_summary(parsed, template_bytes)
+    _load_pptx()
     prs = Presentation(BytesIO(template_bytes))
-
+    with open_template_zip(template_bytes) as z:  # one central-directory parse for theme + media
+        return _analyze_presentation(prs, z, include_placeholders=include_placeholders)
+
+def _template_summary(parsed: Dict[str, object], template_bytes: bytes) -> Dict[str, object]:
+    # Placeholder-free analysis; derived from the cached full info when there is one
+    info = parsed.get("info")
+    if info is not None:
+        return _without_placeholders(info)
+    _load_pptx()
+    with parsed["lock"]:  # the cached Presentation is shared with concurrent copies
+        prs = parsed.get("prs") or Presentation(BytesIO(template_bytes))
+        with open_template_zip(template_bytes) as z:
+            return _analyze_presentation(prs, z, parsed, include_placeholders=False)
+
+def _without_placeholders(info: Dict[str, object]) -> Dict[str, object]:
+    # Summary view of a cached full analysis; shares everything but the layout dicts
+    out = dict(info)
+    out["layouts"] = [{"index": l["index"], "name": l["name"]} for l in info["layouts"]]
+    return out
+
+def inspect_template(template_bytes: bytes, *, include_placeholders: bool = True) -> Tuple[bool, Dict[str, object]]:
+    """
+    Safety verdict + analysis for a template in one call. Both ride on the
+    parse_template cache entry, so re-inspecting the same file is a lookup.
+    include_placeholders=False returns the summary view (see analyze_template).
+    """
+    parsed = parse_template(template_bytes)
+    if not parsed["safe"]:
+        return False, {}
+    if include_placeholders:
+        return True, _template_info(parsed, template_bytes)
+    return True, _template_summary(parsed, template_bytes)
+
+def _template_info(parsed: Dict[str, object], template_bytes: bytes) -> Dict[str, object]:
+    info = parsed.get("info")
+    if info is None:
+        _load_pptx()
+        with parsed["lock"]:  # the cached Presentation is shared with concurrent copies
+            info = parsed.get("info")
+            if info is None:
+                prs = parsed.get("prs") or Presentation(BytesIO(template_bytes))
+                with open_template_zip(template_bytes) as z:
+                    info = _analyze_presentation(prs, z, parsed)
+                parsed["info"] = info  # read-only after this point
+    return info
+
+def _analyze_presentation(
+    prs: Presentation,
+    z: zipfile.ZipFile,
+    parsed: Optional[Dict[str, object]] = None,
+    *,
+    include_placeholders: bool = True,
+) -> Dict[str, object]:
+    # Theme + media go through the entry memo: a later build of the same template reuses them
     dims = get_ppt_dimensions(prs)
-    theme = get_theme_style(template_bytes)
-    images = extract_template_images(template_bytes)
+    theme = template_theme(parsed, z)
+    images = template_media(parsed, z)
 
     layouts: List[Dict[str, object]] = []
     for i, layout in enumerate(prs.slide_layouts):
@@ -290,11 +587,10 @@ def analyze_template(template_bytes: bytes) -> Dict[str, object]:
             lname = getattr(layout, "name", "") or f"Layout {i}"
         except Exception:
             lname = f"Layout {i}"
-        layouts.append({
-            "index": i,
-            "name": lname,
-            "placeholders": _placeholder_summary(layout),
-        })
+        entry: Dict[str, object] = {"index": i, "name": lname}
+        if include_placeholders:
+            entry["placeholders"] = _placeholder_summary(layout)
+        layouts.append(entry)
 
     masters: List[str] = []
     try: